@@ -0,0 +1,32 @@
+"""add_ai_sort_cache
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8b9c0d1e2f3'
+down_revision: Union[str, None] = 'f7a8b9c0d1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # AI category sort results, keyed by a hash of the category's item names
+    op.create_table(
+        'ai_sort_cache',
+        sa.Column('key', sa.String(64), primary_key=True),
+        sa.Column('ordered_names', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ai_sort_cache')
@@ -0,0 +1,31 @@
+"""add_inventory_name_lower_index
+
+Revision ID: b9c0d1e2f3a4
+Revises: a8b9c0d1e2f3
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9c0d1e2f3a4'
+down_revision: Union[str, None] = 'a8b9c0d1e2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lets the seed-confirm duplicate check read normalized names from the index
+    op.create_index(
+        'ix_inventory_items_active_name_lower', 'inventory_items',
+        ['property_id', 'is_active', sa.text('lower(trim(name))')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_items_active_name_lower', table_name='inventory_items')
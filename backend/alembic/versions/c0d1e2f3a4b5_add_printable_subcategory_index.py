@@ -0,0 +1,30 @@
+"""add_printable_subcategory_index
+
+Revision ID: c0d1e2f3a4b5
+Revises: b9c0d1e2f3a4
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0d1e2f3a4b5'
+down_revision: Union[str, None] = 'b9c0d1e2f3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lets the AI-sorted printable list read items in index order
+    op.create_index(
+        'ix_inventory_items_printable_subcategory', 'inventory_items',
+        ['property_id', 'is_active', 'is_recurring', 'category', 'subcategory', 'sort_order', 'name'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_items_printable_subcategory', table_name='inventory_items')
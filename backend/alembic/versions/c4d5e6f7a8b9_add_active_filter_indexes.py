@@ -0,0 +1,29 @@
+"""add_active_filter_indexes
+
+Revision ID: c4d5e6f7a8b9
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d5e6f7a8b9'
+down_revision: Union[str, None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Inventory lookups filter on (property_id, is_active); supplier lists on is_active
+    op.create_index('ix_inventory_items_property_active', 'inventory_items', ['property_id', 'is_active'], unique=False)
+    op.create_index('ix_suppliers_is_active', 'suppliers', ['is_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_suppliers_is_active', table_name='suppliers')
+    op.drop_index('ix_inventory_items_property_active', table_name='inventory_items')
@@ -0,0 +1,31 @@
+"""add_master_products_name_lower_index
+
+Revision ID: d1e2f3a4b5c6
+Revises: c0d1e2f3a4b5
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e2f3a4b5c6'
+down_revision: Union[str, None] = 'c0d1e2f3a4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Case-insensitive master product name lookups (seed-from-property, CSV upload)
+    op.create_index(
+        'ix_master_products_name_lower', 'master_products',
+        [sa.text('lower(name)')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_master_products_name_lower', table_name='master_products')
@@ -0,0 +1,29 @@
+"""add_category_to_inventory_active_index
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e6f7a8b9c0'
+down_revision: Union[str, None] = 'c4d5e6f7a8b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Widen (property_id, is_active) with category so the category list is index-only
+    op.drop_index('ix_inventory_items_property_active', table_name='inventory_items')
+    op.create_index('ix_inventory_items_property_active_category', 'inventory_items', ['property_id', 'is_active', 'category'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_items_property_active_category', table_name='inventory_items')
+    op.create_index('ix_inventory_items_property_active', 'inventory_items', ['property_id', 'is_active'], unique=False)
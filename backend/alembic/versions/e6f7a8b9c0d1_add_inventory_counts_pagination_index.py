@@ -0,0 +1,27 @@
+"""add_inventory_counts_pagination_index
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f7a8b9c0d1'
+down_revision: Union[str, None] = 'd5e6f7a8b9c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Inventory counts are paginated newest-first by (count_date, id) within a property
+    op.create_index('ix_inventory_counts_property_date_id', 'inventory_counts', ['property_id', 'count_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_counts_property_date_id', table_name='inventory_counts')
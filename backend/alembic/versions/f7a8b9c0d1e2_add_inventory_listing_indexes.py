@@ -0,0 +1,37 @@
+"""add_inventory_listing_indexes
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a8b9c0d1e2'
+down_revision: Union[str, None] = 'e6f7a8b9c0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Let the inventory list and printable list read rows in index order instead of sorting
+    op.create_index(
+        'ix_inventory_items_listing', 'inventory_items',
+        ['property_id', 'is_active', sa.text('COALESCE(sort_order, 0)'), sa.text("COALESCE(category, '')"), 'name', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_inventory_items_printable', 'inventory_items',
+        ['property_id', 'is_active', 'is_recurring', 'category', 'sort_order', 'name'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_items_printable', table_name='inventory_items')
+    op.drop_index('ix_inventory_items_listing', table_name='inventory_items')
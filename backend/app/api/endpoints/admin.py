@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pydantic import BaseModel, ConfigDict
 import uuid
+import asyncio
 import base64
 import logging
-import json
+import orjson
 
 from app.core.database import get_db
 from app.core.config import settings
@@ -16,6 +19,7 @@ from app.models.property import Property
 from app.models.order import Order, OrderItem, OrderStatus, OrderItemFlag
 from app.models.supplier import Supplier
 from app.models.inventory import InventoryItem, InventoryCount, InventoryCountItem
+from app.utils.pdf import pdf_render_scale
 
 logger = logging.getLogger(__name__)
 
@@ -96,11 +100,34 @@ class SeedOrderResponse(BaseModel):
 
 # ============== HELPER FUNCTIONS ==============
 
+# Statuses a historical order can be seeded with
+_SEED_STATUS_MAP = {
+    "draft": OrderStatus.DRAFT.value,
+    "submitted": OrderStatus.SUBMITTED.value,
+    "approved": OrderStatus.APPROVED.value,
+    "ordered": OrderStatus.ORDERED.value,
+    "received": OrderStatus.RECEIVED.value,
+}
+
+# Seeded statuses that imply the order was already reviewed/approved, or ordered
+_APPROVED_STATUSES = frozenset({OrderStatus.APPROVED.value, OrderStatus.ORDERED.value, OrderStatus.RECEIVED.value})
+_ORDERED_STATUSES = frozenset({OrderStatus.ORDERED.value, OrderStatus.RECEIVED.value})
+
+
 def generate_order_number(property_code: str) -> str:
     """Generate order number with property code and date (e.g., YRC-20251215)"""
-    return f"{property_code}-{datetime.utcnow().strftime('%Y%m%d')}"
+    now = datetime.utcnow()
+    return f"{property_code}-{now.year:04d}{now.month:02d}{now.day:02d}"
+
+
+# Punctuation handling for normalize_item_name: commas/hyphens split words, apostrophes are dropped
+_PUNCT_TABLE = str.maketrans({",": " ", "-": " ", "'": None})
+
+# Very common/short words that don't help with name matching
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'of', 'and', 'or', 'for', 'in', 'on', 'lb', 'oz', 'ct', 'pk', 'bag', 'box', 'case'})
 
 
+@lru_cache(maxsize=4096)
 def normalize_item_name(name: str) -> str:
     """
     Normalize an item name for comparison by:
@@ -111,30 +138,20 @@ def normalize_item_name(name: str) -> str:
     if not name:
         return ""
 
-    # Convert to lowercase and strip
-    normalized = name.lower().strip()
+    # Lowercase, map punctuation in a single pass, and collapse whitespace
+    return " ".join(name.lower().translate(_PUNCT_TABLE).split())
 
-    # Remove common filler words and punctuation
-    normalized = normalized.replace(",", " ").replace("-", " ").replace("'", "")
 
-    # Collapse multiple spaces
-    normalized = " ".join(normalized.split())
-
-    return normalized
-
-
-def get_name_tokens(name: str) -> set:
-    """Get a set of meaningful tokens from a name for fuzzy matching"""
+@lru_cache(maxsize=4096)
+def get_name_tokens(name: str) -> frozenset:
+    """
+    Get a set of meaningful tokens from a name for fuzzy matching.
+    Returns a frozenset because results are cached and shared between callers.
+    """
     normalized = normalize_item_name(name)
 
-    # Split into tokens
-    tokens = set(normalized.split())
-
-    # Remove very common/short words that don't help with matching
-    stop_words = {'the', 'a', 'an', 'of', 'and', 'or', 'for', 'in', 'on', 'lb', 'oz', 'ct', 'pk', 'bag', 'box', 'case'}
-    tokens = tokens - stop_words
-
-    return tokens
+    # Split into tokens, dropping very common/short words that don't help with matching
+    return frozenset(normalized.split()) - _STOP_WORDS
 
 
 def calculate_name_similarity(name1: str, name2: str) -> float:
@@ -161,17 +178,21 @@ def calculate_name_similarity(name1: str, name2: str) -> float:
     if not tokens1 or not tokens2:
         return 0.0
 
+    # Also check if one name contains the other (handles abbreviations)
+    contains_bonus = 0.0
+    if norm1 in norm2 or norm2 in norm1:
+        contains_bonus = 0.3
+
+    # No shared tokens means Jaccard is 0 and neither can be a subset - skip the set math
+    if tokens1.isdisjoint(tokens2):
+        return contains_bonus
+
     # Calculate Jaccard similarity (intersection over union)
     intersection = tokens1 & tokens2
     union = tokens1 | tokens2
 
     jaccard = len(intersection) / len(union) if union else 0.0
 
-    # Also check if one name contains the other (handles abbreviations)
-    contains_bonus = 0.0
-    if norm1 in norm2 or norm2 in norm1:
-        contains_bonus = 0.3
-
     # Check for common food name inversions (e.g., "Beans, black" vs "Black Beans")
     # If all tokens from one are in the other, it's likely the same item
     if tokens1.issubset(tokens2) or tokens2.issubset(tokens1):
@@ -180,28 +201,69 @@ def calculate_name_similarity(name1: str, name2: str) -> float:
     return min(1.0, jaccard + contains_bonus)
 
 
-def find_matching_inventory_item(
+def build_inventory_match_index(inventory_items: List[InventoryItem]) -> tuple:
+    """
+    Build lookup structures for matching item names against a property's inventory.
+
+    Returns:
+        (norm_map, token_index, indexed_items) where norm_map maps a normalized
+        name to its first inventory item, token_index maps each name token to the
+        positions (in indexed_items) of the items containing it.
+    """
+    norm_map: Dict[str, InventoryItem] = {}
+    token_index: Dict[str, Set[int]] = {}
+    indexed_items: List[InventoryItem] = []
+
+    for inv_item in inventory_items:
+        add_to_match_index(inv_item, norm_map, token_index, indexed_items)
+
+    return norm_map, token_index, indexed_items
+
+
+def add_to_match_index(
+    inv_item: InventoryItem,
+    norm_map: Dict[str, InventoryItem],
+    token_index: Dict[str, Set[int]],
+    indexed_items: List[InventoryItem]
+) -> None:
+    """Add an inventory item to the structures built by build_inventory_match_index"""
+    position = len(indexed_items)
+    indexed_items.append(inv_item)
+    norm_map.setdefault(normalize_item_name(inv_item.name), inv_item)
+    for token in get_name_tokens(inv_item.name):
+        token_index.setdefault(token, set()).add(position)
+
+
+def find_match(
     item_name: str,
-    property_id: int,
-    db,
+    norm_map: Dict[str, InventoryItem],
+    token_index: Dict[str, Set[int]],
+    indexed_items: List[InventoryItem],
     similarity_threshold: float = 0.6
 ) -> tuple:
     """
-    Find a matching inventory item by name similarity.
+    Find a matching inventory item by name similarity using a prebuilt index.
+
+    Only items sharing at least one token with item_name are scored; an item
+    with no shared token can score at most the 0.3 contains bonus.
 
     Returns:
         (inventory_item, similarity_score) if found, (None, 0.0) otherwise
     """
-    # Get all inventory items for this property
-    inventory_items = db.query(InventoryItem).filter(
-        InventoryItem.property_id == property_id,
-        InventoryItem.is_active == True
-    ).all()
+    exact_match = norm_map.get(normalize_item_name(item_name))
+    if exact_match is not None:
+        return exact_match, 1.0
+
+    candidates = set()
+    for token in get_name_tokens(item_name):
+        candidates |= token_index.get(token, set())
 
     best_match = None
     best_score = 0.0
 
-    for inv_item in inventory_items:
+    # Score in insertion order so ties resolve the same way as a full scan
+    for position in sorted(candidates):
+        inv_item = indexed_items[position]
         score = calculate_name_similarity(item_name, inv_item.name)
         if score > best_score:
             best_score = score
@@ -214,43 +276,112 @@ def find_matching_inventory_item(
     return None, 0.0
 
 
-def calculate_order_total(order: Order) -> float:
-    """Calculate estimated total for an order"""
+def build_supplier_lookup(suppliers: List[Supplier]) -> Dict[str, Supplier]:
+    """Map normalized supplier names to suppliers for find_supplier"""
+    supplier_by_norm: Dict[str, Supplier] = {}
+    for supplier in suppliers:
+        supplier_by_norm.setdefault(normalize_item_name(supplier.name), supplier)
+    return supplier_by_norm
+
+
+def find_supplier(
+    supplier_name: str,
+    suppliers: List[Supplier],
+    supplier_by_norm: Dict[str, Supplier]
+) -> Optional[Supplier]:
+    """
+    Find a supplier by name from a preloaded list.
+    Tries a normalized exact match first, then a case-insensitive substring match.
+    """
+    supplier = supplier_by_norm.get(normalize_item_name(supplier_name))
+    if supplier is not None:
+        return supplier
+
+    needle = supplier_name.lower()
+    return next((s for s in suppliers if needle in s.name.lower()), None)
+
+
+def calculate_order_total(order_items: List[OrderItem]) -> float:
+    """Calculate estimated total for an order's items"""
     total = 0.0
-    for item in order.items:
+    for item in order_items:
         qty = item.approved_quantity if item.approved_quantity is not None else item.requested_quantity
         price = item.unit_price or 0
         total += qty * price
     return total
 
 
-def convert_pdf_to_images(pdf_content: bytes) -> list:
-    """Convert PDF pages to base64-encoded PNG images for OpenAI Vision API"""
+# Minimum average characters of text per page for a PDF to be treated as
+# text-based; scanned PDFs yield little or no text and go through Vision instead
+PDF_TEXT_MIN_CHARS_PER_PAGE = 200
+
+
+def extract_text_from_pdf(pdf_content: bytes) -> Optional[str]:
+    """
+    Extract the text layer from a PDF.
+    Returns None when the PDF has too little text (e.g. a scanned document).
+    """
     try:
         import fitz  # PyMuPDF
-        import io
 
-        images = []
         pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+        page_count = len(pdf_doc)
+        text = "\n".join(page.get_text("text") for page in pdf_doc)
+        pdf_doc.close()
+    except Exception as e:
+        logger.warning(f"Could not extract text from PDF, falling back to images: {e}")
+        return None
+
+    if page_count == 0 or len(text.strip()) < PDF_TEXT_MIN_CHARS_PER_PAGE * page_count:
+        return None
+
+    return text
+
 
-        for page_num in range(len(pdf_doc)):
-            page = pdf_doc[page_num]
-            # Render at 2x resolution for better OCR
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
+# Only the first few pages are sent to Vision to stay within token limits
+PDF_MAX_PAGES = 5
+PDF_RENDER_WORKERS = 4
 
-            # Convert to PNG bytes
-            img_bytes = pix.tobytes("png")
-            img_base64 = base64.standard_b64encode(img_bytes).decode("utf-8")
-            images.append(img_base64)
 
-            # Limit to first 5 pages to avoid token limits
-            if page_num >= 4:
-                logger.warning(f"PDF has {len(pdf_doc)} pages, only processing first 5")
-                break
+def _render_pdf_page(pdf_content: bytes, page_num: int) -> str:
+    """Render a single PDF page to a base64-encoded JPEG image"""
+    import fitz  # PyMuPDF
 
+    # Each worker opens its own document; fitz documents are not thread-safe
+    pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+    try:
+        page = pdf_doc[page_num]
+        # Scale to the page's size rather than a fixed factor; no alpha channel needed
+        scale = pdf_render_scale(page)
+        mat = fitz.Matrix(scale, scale)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+
+        # JPEG is several times smaller than PNG for the upload
+        img_bytes = pix.tobytes("jpeg", jpg_quality=85)
+        return base64.standard_b64encode(img_bytes).decode("utf-8")
+    finally:
+        pdf_doc.close()
+
+
+def convert_pdf_to_images(pdf_content: bytes) -> list:
+    """
+    Convert PDF pages to base64-encoded JPEG images for OpenAI Vision API.
+    Pages are rendered in a thread pool; PyMuPDF releases the GIL while rendering.
+    """
+    try:
+        import fitz  # PyMuPDF
+
+        pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+        page_count = len(pdf_doc)
         pdf_doc.close()
-        return images
+
+        if page_count > PDF_MAX_PAGES:
+            logger.warning(f"PDF has {page_count} pages, only processing first {PDF_MAX_PAGES}")
+        page_nums = range(min(page_count, PDF_MAX_PAGES))
+
+        with ThreadPoolExecutor(max_workers=PDF_RENDER_WORKERS) as executor:
+            # map() yields results in page order
+            return list(executor.map(lambda page_num: _render_pdf_page(pdf_content, page_num), page_nums))
     except Exception as e:
         logger.error(f"Error converting PDF to images: {e}")
         raise HTTPException(
@@ -299,7 +430,7 @@ async def extract_order_with_ai(content: bytes, file_type: str, supplier_names:
 
     try:
         import openai
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
         # Build supplier list for the prompt
         supplier_list_str = ", ".join(supplier_names) if supplier_names else "No suppliers defined yet"
@@ -396,9 +527,14 @@ DO NOT include notes or descriptions for items - just standardize the name itsel
 
         if file_type == "docx":
             # For DOCX, extract text and send as text content
-            text_content = extract_text_from_docx(content)
+            # (document parsing is CPU-bound, so keep it off the event loop)
+            text_content = await asyncio.to_thread(extract_text_from_docx, content)
+        else:
+            # Text-based PDFs skip rasterization and go through the same text path
+            text_content = await asyncio.to_thread(extract_text_from_pdf, content)
 
-            response = client.chat.completions.create(
+        if text_content is not None:
+            response = await client.chat.completions.create(
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -411,8 +547,8 @@ DO NOT include notes or descriptions for items - just standardize the name itsel
                 response_format={"type": "json_object"}
             )
         else:
-            # For PDF, convert to images first (OpenAI Vision API doesn't support PDFs directly)
-            pdf_images = convert_pdf_to_images(content)
+            # Scanned PDF - convert to images (OpenAI Vision API doesn't support PDFs directly)
+            pdf_images = await asyncio.to_thread(convert_pdf_to_images, content)
 
             if not pdf_images:
                 raise HTTPException(
@@ -432,11 +568,11 @@ DO NOT include notes or descriptions for items - just standardize the name itsel
                 content_parts.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{img_base64}"
+                        "url": f"data:image/jpeg;base64,{img_base64}"
                     }
                 })
 
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -451,7 +587,7 @@ DO NOT include notes or descriptions for items - just standardize the name itsel
 
         # Parse the response
         result_text = response.choices[0].message.content
-        result_data = json.loads(result_text)
+        result_data = orjson.loads(result_text)
 
         # Validate and convert to our schema
         items = []
@@ -474,10 +610,11 @@ DO NOT include notes or descriptions for items - just standardize the name itsel
             supplier_name=result_data.get("supplier_name"),
             notes=result_data.get("notes"),
             confidence_score=float(result_data.get("confidence_score", 0.8)),
-            raw_text=result_text
+            # The raw model output duplicates the parsed items; only return it for debugging
+            raw_text=result_text if settings.DEBUG else None
         )
 
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"Failed to parse AI response as JSON: {e}")
         raise HTTPException(
             status_code=500,
@@ -491,6 +628,26 @@ DO NOT include notes or descriptions for items - just standardize the name itsel
         )
 
 
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 10MB limit
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+async def read_upload_limited(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an uploaded file in chunks, failing with 413 as soon as it exceeds max_bytes"""
+    buffer = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds {max_bytes // (1024 * 1024)}MB limit"
+            )
+    return bytes(buffer)
+
+
 # ============== ENDPOINTS ==============
 
 @router.post("/extract-order-pdf", response_model=ExtractedOrderData)
@@ -515,14 +672,8 @@ async def extract_order_from_document(
             detail="Only PDF and DOCX files are supported"
         )
 
-    # Read file content
-    content = await file.read()
-
-    if len(content) > 10 * 1024 * 1024:  # 10MB limit
-        raise HTTPException(
-            status_code=400,
-            detail="File size exceeds 10MB limit"
-        )
+    # Read file content in chunks so an oversized upload is rejected early
+    content = await read_upload_limited(file, MAX_UPLOAD_BYTES)
 
     # Fetch existing suppliers to help AI match names
     suppliers = db.query(Supplier).filter(Supplier.is_active == True).all()
@@ -556,14 +707,8 @@ def seed_historical_order(
         raise HTTPException(status_code=400, detail="Invalid date format. Use ISO format (YYYY-MM-DD)")
 
     # Determine status
-    status_map = {
-        "draft": OrderStatus.DRAFT.value,
-        "submitted": OrderStatus.SUBMITTED.value,
-        "approved": OrderStatus.APPROVED.value,
-        "ordered": OrderStatus.ORDERED.value,
-        "received": OrderStatus.RECEIVED.value,
-    }
-    order_status = status_map.get(request.status.lower(), OrderStatus.RECEIVED.value)
+    order_status = _SEED_STATUS_MAP.get(request.status.lower(), OrderStatus.RECEIVED.value)
+    is_approved = order_status in _APPROVED_STATUSES
 
     # Create the order
     order = Order(
@@ -574,32 +719,44 @@ def seed_historical_order(
         created_by=current_user.id,
         status=order_status,
         submitted_at=order_date if order_status != OrderStatus.DRAFT.value else None,
-        reviewed_by=current_user.id if order_status in [OrderStatus.APPROVED.value, OrderStatus.ORDERED.value, OrderStatus.RECEIVED.value] else None,
-        reviewed_at=order_date if order_status in [OrderStatus.APPROVED.value, OrderStatus.ORDERED.value, OrderStatus.RECEIVED.value] else None,
-        approved_at=order_date if order_status in [OrderStatus.APPROVED.value, OrderStatus.ORDERED.value, OrderStatus.RECEIVED.value] else None,
-        ordered_at=order_date if order_status in [OrderStatus.ORDERED.value, OrderStatus.RECEIVED.value] else None,
+        reviewed_by=current_user.id if is_approved else None,
+        reviewed_at=order_date if is_approved else None,
+        approved_at=order_date if is_approved else None,
+        ordered_at=order_date if order_status in _ORDERED_STATUSES else None,
         received_at=order_date if order_status == OrderStatus.RECEIVED.value else None,
         created_at=order_date,  # Set created_at to the historical date
     )
     db.add(order)
     db.flush()
 
-    # Add items and create/update inventory items for this property
+    # Load the property's inventory once and index it for name matching
+    inventory_items = db.query(InventoryItem).filter(
+        InventoryItem.property_id == request.property_id,
+        InventoryItem.is_active == True
+    ).all()
+    norm_map, token_index, indexed_items = build_inventory_match_index(inventory_items)
+
+    # Load suppliers once; each line's supplier name is resolved in memory
+    suppliers = db.query(Supplier).all()
+    supplier_by_norm = build_supplier_lookup(suppliers)
+
+    # Pass 1: match each line to an inventory item, creating new items in memory
+    new_inventory_items = []
+    line_items = []  # (item_data, inventory_item, supplier_id, unit, unit_price)
     for item_data in request.items:
         # Try to find matching supplier from seeded data
         new_supplier_id = None
         if item_data.supplier_name:
-            supplier = db.query(Supplier).filter(
-                Supplier.name.ilike(f"%{item_data.supplier_name}%")
-            ).first()
+            supplier = find_supplier(item_data.supplier_name, suppliers, supplier_by_norm)
             if supplier:
                 new_supplier_id = supplier.id
 
         # Use fuzzy matching to find existing inventory item
-        inventory_item, match_score = find_matching_inventory_item(
+        inventory_item, match_score = find_match(
             item_data.item_name,
-            request.property_id,
-            db,
+            norm_map,
+            token_index,
+            indexed_items,
             similarity_threshold=0.6
         )
 
@@ -641,8 +798,10 @@ def seed_historical_order(
                 is_active=True,
                 is_recurring=item_data.is_recurring
             )
-            db.add(inventory_item)
-            db.flush()  # Get the ID
+            new_inventory_items.append(inventory_item)
+
+            # Let later lines in this order match the newly created item
+            add_to_match_index(inventory_item, norm_map, token_index, indexed_items)
 
             logger.info(f"Created new inventory item: '{item_data.item_name}'")
 
@@ -650,8 +809,17 @@ def seed_historical_order(
             final_unit = item_data.unit or "Unit"
             final_unit_price = item_data.unit_price
 
-        # Create order item linked to the inventory item
-        order_item = OrderItem(
+        line_items.append((item_data, inventory_item, final_supplier_id, final_unit, final_unit_price))
+
+    # Insert all new inventory items in one flush to get their IDs
+    if new_inventory_items:
+        db.add_all(new_inventory_items)
+        db.flush()
+
+    # Pass 2: create order items linked to the matched/created inventory items
+    order_items = []
+    for item_data, inventory_item, final_supplier_id, final_unit, final_unit_price in line_items:
+        order_items.append(OrderItem(
             order_id=order.id,
             inventory_item_id=inventory_item.id,  # Link to matched/created inventory item
             custom_item_name=None,  # Use inventory item's name, not custom
@@ -664,14 +832,11 @@ def seed_historical_order(
             unit_price=final_unit_price,
             camp_notes=item_data.notes,
             is_received=order_status == OrderStatus.RECEIVED.value
-        )
-        db.add(order_item)
-
-    db.commit()
-    db.refresh(order)
+        ))
+    db.add_all(order_items)
 
-    # Update estimated total
-    order.estimated_total = calculate_order_total(order)
+    # Set totals from the items built above so the whole seed is a single commit
+    order.estimated_total = calculate_order_total(order_items)
     if order_status == OrderStatus.RECEIVED.value:
         order.actual_total = order.estimated_total
     db.commit()
@@ -683,7 +848,7 @@ def seed_historical_order(
         property_id=order.property_id,
         status=order.status,
         week_of=order.week_of,
-        item_count=len(order.items),
+        item_count=len(order_items),
         estimated_total=order.estimated_total or 0,
         created_at=order.created_at
     )
@@ -1,30 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import and_, case, func, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, raiseload
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional, Tuple, Union
+from pydantic import TypeAdapter
+from collections import OrderedDict, defaultdict
+from contextlib import aclosing
 from datetime import datetime
+import asyncio
 import base64
+import hashlib
 import json
 import io
+import orjson
+import time
 
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.core.http_client import OpenAIAPIError, iter_chat_completion, stream_chat_completion
 from app.core.security import (
-    get_current_user, require_property_access,
+    get_current_user, require_property_access, property_access_clause,
     require_supervisor_or_admin, require_admin
 )
 from app.models.user import User, UserRole
 from app.models.property import Property
-from app.models.inventory import InventoryItem, InventoryCount, InventoryCountItem
+from app.models.inventory import InventoryItem, InventoryCount, InventoryCountItem, AISortCache, calculate_suggested_order_qty
+from app.models.supplier import Supplier
 from app.models.master_product import MasterProduct
 from app.schemas.inventory import (
     InventoryItemCreate, InventoryItemUpdate, InventoryItemResponse, InventoryItemWithStatus,
     InventoryCountCreate, InventoryCountUpdate, InventoryCountResponse, InventoryCountWithItems,
-    PrintableInventoryList, PrintableInventoryItem, InventoryCountItemWithDetails
+    PrintableInventoryList, PrintableInventoryItem
 )
+from app.utils.names import NameMatchIndex
+from app.utils.pdf import pdf_render_scale
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
+# Columns selected by list_inventory_items (everything InventoryItemWithStatus
+# reads from the item row itself)
+_ITEM_LIST_COLUMNS = (
+    InventoryItem.id, InventoryItem.property_id, InventoryItem.name,
+    InventoryItem.description, InventoryItem.category, InventoryItem.subcategory,
+    InventoryItem.qty, InventoryItem.product_notes, InventoryItem.brand,
+    InventoryItem.supplier_id, InventoryItem.unit, InventoryItem.pack_size,
+    InventoryItem.pack_unit, InventoryItem.order_unit, InventoryItem.units_per_order_unit,
+    InventoryItem.unit_price, InventoryItem.par_level, InventoryItem.order_at,
+    InventoryItem.sort_order, InventoryItem.current_stock, InventoryItem.avg_weekly_usage,
+    InventoryItem.is_active, InventoryItem.location, InventoryItem.seasonal_availability,
+    InventoryItem.is_recurring, InventoryItem.created_at, InventoryItem.updated_at,
+)
+
+# Sort keys for the inventory list, with id as a tiebreaker. NULLs are coalesced
+# so the keyset cursor comparison behaves the same on Postgres and SQLite.
+_ITEM_LIST_SORT_KEYS = (
+    func.coalesce(InventoryItem.sort_order, 0),
+    func.coalesce(InventoryItem.category, ""),
+    InventoryItem.name,
+    InventoryItem.id,
+)
+# JSON types of those keys' values in a cursor
+_ITEM_LIST_CURSOR_TYPES = (int, str, str, int)
+
+
+def _with_loads(query, *options):
+    """
+    Apply eager-load options to a query. With DEBUG on, also add raiseload("*") so
+    any relationship the route didn't eager-load raises instead of lazy-loading (N+1).
+    """
+    if settings.DEBUG:
+        options = (*options, raiseload("*"))
+    return query.options(*options)
+
+
+# Validates and serializes list_inventory_items responses; built once at import
+_ITEM_LIST_ADAPTER = TypeAdapter(List[InventoryItemWithStatus])
+
 
 def _auto_link_to_master_product(item: InventoryItem, db: Session):
     """
@@ -80,12 +133,16 @@ def list_inventory_items(
     category: Optional[str] = None,
     supplier_id: Optional[int] = None,
     low_stock_only: bool = False,
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Number of records to skip (use cursor instead)"),
     limit: int = Query(1000, ge=1, le=5000, description="Max records to return"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List inventory items for a property"""
+    """
+    List inventory items for a property.
+    When a full page is returned, the cursor for the next page is sent in the X-Next-Cursor header.
+    """
     # Determine which property to query
     if property_id:
         require_property_access(property_id, current_user)
@@ -97,7 +154,15 @@ def list_inventory_items(
         # Admin/supervisor can see all if no property specified
         pass
 
-    query = db.query(InventoryItem).filter(InventoryItem.is_active == True)
+    # Select plain columns (plus supplier name via join) instead of hydrating
+    # ORM objects; rows are turned straight into response dicts below
+    query = db.query(
+        *_ITEM_LIST_COLUMNS,
+        Supplier.name.label("supplier_name"),
+        InventoryItem.is_low_stock().label("is_low_stock")
+    ).outerjoin(
+        Supplier, InventoryItem.supplier_id == Supplier.id
+    ).filter(InventoryItem.is_active == True)
 
     if property_id:
         query = query.filter(InventoryItem.property_id == property_id)
@@ -105,50 +170,39 @@ def list_inventory_items(
         query = query.filter(InventoryItem.category == category)
     if supplier_id:
         query = query.filter(InventoryItem.supplier_id == supplier_id)
+    if low_stock_only:
+        # Filter in SQL so skip/limit apply to the low-stock rows
+        query = query.filter(InventoryItem.is_low_stock())
+    if cursor:
+        # Keyset pagination: continue after the last row of the previous page
+        query = query.filter(tuple_(*_ITEM_LIST_SORT_KEYS) > tuple_(*decode_cursor(cursor, _ITEM_LIST_CURSOR_TYPES)))
 
-    items = query.order_by(InventoryItem.sort_order, InventoryItem.category, InventoryItem.name).offset(skip).limit(limit).all()
+    rows = query.order_by(*_ITEM_LIST_SORT_KEYS).offset(skip).limit(limit).all()
 
     result = []
-    for item in items:
-        item_dict = {
-            "id": item.id,
-            "property_id": item.property_id,
-            "name": item.name,
-            "description": item.description,
-            "category": item.category,
-            "subcategory": item.subcategory,
-            "qty": item.qty,
-            "product_notes": item.product_notes,
-            "brand": item.brand,
-            "supplier_id": item.supplier_id,
-            "unit": item.unit,
-            "pack_size": item.pack_size,
-            "pack_unit": item.pack_unit,
-            "order_unit": item.order_unit,
-            "units_per_order_unit": item.units_per_order_unit,
-            "unit_price": item.unit_price,
-            "par_level": item.par_level,
-            "order_at": item.order_at,
-            "sort_order": item.sort_order,
-            "current_stock": item.current_stock or 0,
-            "avg_weekly_usage": item.avg_weekly_usage,
-            "is_active": item.is_active,
-            "location": item.location,
-            "seasonal_availability": item.seasonal_availability or "year_round",
-            "is_recurring": item.is_recurring if item.is_recurring is not None else True,
-            "created_at": item.created_at,
-            "updated_at": item.updated_at,
-            "is_low_stock": item.is_low_stock(),
-            "suggested_order_qty": item.suggested_order_qty(),
-            "supplier_name": item.supplier.name if item.supplier else None,
-            "effective_order_unit": item.get_effective_order_unit()
-        }
-        result.append(InventoryItemWithStatus(**item_dict))
-
-    if low_stock_only:
-        result = [r for r in result if r.is_low_stock]
-
-    return result
+    for row in rows:
+        item_dict = row._asdict()
+        item_dict["current_stock"] = row.current_stock or 0
+        item_dict["seasonal_availability"] = row.seasonal_availability or "year_round"
+        item_dict["is_recurring"] = row.is_recurring if row.is_recurring is not None else True
+        item_dict["is_low_stock"] = bool(row.is_low_stock)
+        item_dict["suggested_order_qty"] = calculate_suggested_order_qty(
+            row.current_stock, row.par_level, row.order_at,
+            row.avg_weekly_usage, row.units_per_order_unit
+        )
+        item_dict["effective_order_unit"] = row.order_unit or row.unit
+        result.append(item_dict)
+
+    # Validate and serialize the whole list in one pass with the prebuilt adapter;
+    # returning a Response skips FastAPI's second response_model validation
+    response = Response(
+        content=_ITEM_LIST_ADAPTER.dump_json(_ITEM_LIST_ADAPTER.validate_python(result)),
+        media_type="application/json"
+    )
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.sort_order or 0, last.category or "", last.name, last.id])
+    return response
 
 
 @router.get("/items/categories")
@@ -165,13 +219,16 @@ def list_categories(
 
     query = db.query(InventoryItem.category).filter(
         InventoryItem.is_active == True,
-        InventoryItem.category.isnot(None)
-    ).distinct()
+        InventoryItem.category.isnot(None),
+        InventoryItem.category != ''
+    )
 
     if property_id:
+        # Served from ix_inventory_items_property_active_category
         query = query.filter(InventoryItem.property_id == property_id)
 
-    return [c[0] for c in query.all() if c[0]]
+    # NULL and blank categories are already excluded in SQL
+    return [category for (category,) in query.distinct().all()]
 
 
 @router.get("/items/{item_id}", response_model=InventoryItemWithStatus)
@@ -181,7 +238,9 @@ def get_inventory_item(
     db: Session = Depends(get_db)
 ):
     """Get single inventory item"""
-    item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
+    item = _with_loads(
+        db.query(InventoryItem), joinedload(InventoryItem.supplier)
+    ).filter(InventoryItem.id == item_id).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -193,7 +252,8 @@ def get_inventory_item(
     item_data["suggested_order_qty"] = item.suggested_order_qty()
     item_data["supplier_name"] = item.supplier.name if item.supplier else None
     item_data["effective_order_unit"] = item.get_effective_order_unit()
-    return InventoryItemWithStatus(**item_data)
+    # item_data was just validated, so skip re-validating it here
+    return InventoryItemWithStatus.model_construct(**item_data)
 
 
 @router.post("/items", response_model=InventoryItemResponse, status_code=status.HTTP_201_CREATED)
@@ -251,28 +311,39 @@ def delete_inventory_item(
     db: Session = Depends(get_db)
 ):
     """Soft delete inventory item (camp worker for their property, or supervisor/admin)"""
-    item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    # Camp workers can only delete items from their own property
-    require_property_access(item.property_id, current_user)
-
-    item.is_active = False
+    # Single UPDATE; camp workers can only delete items from their own property
+    result = db.execute(
+        update(InventoryItem).where(
+            InventoryItem.id == item_id,
+            property_access_clause(current_user, InventoryItem.property_id)
+        ).values(is_active=False).execution_options(synchronize_session=False)
+    )
     db.commit()
 
+    if not result.rowcount:
+        # Nothing updated: tell a missing item apart from one the user can't access
+        item_property_id = db.query(InventoryItem.property_id).filter(InventoryItem.id == item_id).scalar()
+        if item_property_id is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        require_property_access(item_property_id, current_user)
+
 
 # ============== INVENTORY COUNTS ==============
 
 @router.get("/counts", response_model=List[InventoryCountResponse])
 def list_inventory_counts(
+    response: Response,
     property_id: Optional[int] = None,
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Number of records to skip (use cursor instead)"),
     limit: int = Query(50, ge=1, le=500, description="Max records to return"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List inventory count sessions"""
+    """
+    List inventory count sessions, newest first.
+    When a full page is returned, the cursor for the next page is sent in the X-Next-Cursor header.
+    """
     if property_id:
         require_property_access(property_id, current_user)
     elif current_user.role == UserRole.CAMP_WORKER.value:
@@ -281,8 +352,25 @@ def list_inventory_counts(
     query = db.query(InventoryCount)
     if property_id:
         query = query.filter(InventoryCount.property_id == property_id)
+    if cursor:
+        # Keyset pagination: continue after the last count of the previous page
+        cursor_date, cursor_id = decode_cursor(cursor, (str, int))
+        try:
+            cursor_date = datetime.fromisoformat(cursor_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(InventoryCount.count_date, InventoryCount.id) < tuple_(cursor_date, cursor_id)
+        )
 
-    return query.order_by(InventoryCount.count_date.desc()).offset(skip).limit(limit).all()
+    counts = query.order_by(
+        InventoryCount.count_date.desc(), InventoryCount.id.desc()
+    ).offset(skip).limit(limit).all()
+    if len(counts) == limit:
+        last = counts[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.count_date, last.id])
+
+    return counts
 
 
 @router.get("/counts/{count_id}", response_model=InventoryCountWithItems)
@@ -298,24 +386,48 @@ def get_inventory_count(
 
     require_property_access(count.property_id, current_user)
 
-    # Build from base schema to avoid validating items relationship directly
-    base_data = InventoryCountResponse.model_validate(count).model_dump()
+    # Select just the columns the response needs, with item details joined in,
+    # instead of loading the items relationship and each inventory item
+    rows = db.query(
+        InventoryCountItem.id,
+        InventoryCountItem.inventory_item_id,
+        InventoryCountItem.quantity,
+        InventoryCountItem.notes,
+        InventoryCountItem.confidence,
+        InventoryCountItem.created_at,
+        InventoryItem.name.label("item_name"),
+        InventoryItem.category.label("item_category"),
+        InventoryItem.unit.label("item_unit")
+    ).outerjoin(
+        InventoryItem, InventoryCountItem.inventory_item_id == InventoryItem.id
+    ).filter(
+        InventoryCountItem.inventory_count_id == count_id
+    ).order_by(InventoryCountItem.id).all()
+
     items_detail = []
-    for item in count.items:
-        item_detail = InventoryCountItemWithDetails(
-            id=item.id,
-            inventory_item_id=item.inventory_item_id,
-            quantity=item.quantity,
-            notes=item.notes,
-            confidence=item.confidence,
-            created_at=item.created_at,
-            item_name=item.inventory_item.name if item.inventory_item else "Unknown",
-            item_category=item.inventory_item.category if item.inventory_item else None,
-            item_unit=item.inventory_item.unit if item.inventory_item else "unit"
-        )
+    for row in rows:
+        item_detail = row._asdict()
+        if item_detail["item_name"] is None:
+            # Inventory item no longer exists
+            item_detail["item_name"] = "Unknown"
+            item_detail["item_unit"] = "unit"
         items_detail.append(item_detail)
 
-    return InventoryCountWithItems(**base_data, items=items_detail)
+    # Build from base schema to avoid validating items relationship directly;
+    # response_model validates the combined result once
+    base_data = InventoryCountResponse.model_validate(count).model_dump()
+    return {**base_data, "items": items_detail}
+
+
+def _set_stock_levels(db: Session, stock_by_item_id: Dict[int, float]) -> None:
+    """Set current_stock for several inventory items with a single UPDATE ... CASE"""
+    if stock_by_item_id:
+        db.execute(
+            update(InventoryItem)
+            .where(InventoryItem.id.in_(stock_by_item_id.keys()))
+            .values(current_stock=case(stock_by_item_id, value=InventoryItem.id))
+            .execution_options(synchronize_session=False)
+        )
 
 
 @router.post("/counts", response_model=InventoryCountResponse, status_code=status.HTTP_201_CREATED)
@@ -336,22 +448,19 @@ def create_inventory_count(
     db.add(count)
     db.flush()
 
-    # Add count items and update stock levels
-    for item_data in count_data.items:
-        count_item = InventoryCountItem(
+    # Add count items
+    db.add_all([
+        InventoryCountItem(
             inventory_count_id=count.id,
             inventory_item_id=item_data.inventory_item_id,
             quantity=item_data.quantity,
             notes=item_data.notes
         )
-        db.add(count_item)
+        for item_data in count_data.items
+    ])
 
-        # Update the inventory item's current stock
-        inv_item = db.query(InventoryItem).filter(
-            InventoryItem.id == item_data.inventory_item_id
-        ).first()
-        if inv_item:
-            inv_item.current_stock = item_data.quantity
+    # Update stock levels (last count wins for repeated items)
+    _set_stock_levels(db, {item_data.inventory_item_id: item_data.quantity for item_data in count_data.items})
 
     db.commit()
     db.refresh(count)
@@ -374,11 +483,12 @@ def finalize_inventory_count(
     if count.is_finalized:
         raise HTTPException(status_code=400, detail="Count already finalized")
 
-    # Update inventory item stock levels
-    for count_item in count.items:
-        inv_item = count_item.inventory_item
-        if inv_item:
-            inv_item.current_stock = count_item.quantity
+    # Update inventory item stock levels from the counted quantities
+    # (last count wins for repeated items)
+    counted = db.query(InventoryCountItem.inventory_item_id, InventoryCountItem.quantity).filter(
+        InventoryCountItem.inventory_count_id == count.id
+    ).order_by(InventoryCountItem.id).all()
+    _set_stock_levels(db, {item_id: quantity for item_id, quantity in counted})
 
     count.is_finalized = True
     db.commit()
@@ -401,8 +511,15 @@ def get_printable_inventory_list(
     if not prop:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    # Only include recurring items on the printable sheet
-    items = db.query(InventoryItem).filter(
+    # Only include recurring items on the printable sheet. Only the printed columns
+    # are selected, as plain rows rather than InventoryItem objects.
+    rows = db.query(
+        InventoryItem.name,
+        InventoryItem.category,
+        InventoryItem.unit,
+        InventoryItem.par_level,
+        InventoryItem.current_stock
+    ).filter(
         InventoryItem.property_id == property_id,
         InventoryItem.is_active == True,
         InventoryItem.is_recurring == True
@@ -410,13 +527,13 @@ def get_printable_inventory_list(
 
     printable_items = [
         PrintableInventoryItem(
-            name=item.name,
-            category=item.category,
-            unit=item.unit,
-            par_level=item.par_level,
-            current_stock=item.current_stock or 0
+            name=row.name,
+            category=row.category,
+            unit=row.unit,
+            par_level=row.par_level,
+            current_stock=row.current_stock or 0
         )
-        for item in items
+        for row in rows
     ]
 
     return PrintableInventoryList(
@@ -429,58 +546,121 @@ def get_printable_inventory_list(
 
 # ============== AI VISION ANALYSIS ==============
 
-@router.post("/analyze-photos")
-async def analyze_inventory_photos(
-    property_id: int,
-    images: List[UploadFile] = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+# At detail "high", OpenAI scales images to fit 2048px and then to a 768px short
+# side before tiling, so pixels beyond that only add upload bytes
+VISION_MAX_DIMENSION = 2048
+VISION_MAX_SHORT_SIDE = 768
+VISION_JPEG_QUALITY = 80
+SEED_PDF_MAX_PAGES = 10
+VISION_MODEL = "gpt-4o"
+
+# Recent per-page vision results, so re-uploading the same sheet (retries, refreshes)
+# doesn't pay for another OpenAI call: cache key -> (stored_at, result)
+VISION_CACHE_TTL_SECONDS = 24 * 60 * 60
+VISION_CACHE_MAX_ENTRIES = 256
+_vision_cache: "OrderedDict[str, Tuple[float, list]]" = OrderedDict()
+
+
+def _vision_cache_key(system_prompt: str, jpeg_bytes: bytes) -> str:
     """
-    Analyze uploaded photos of inventory count sheets using OpenAI Vision.
-    Supports multiple images (pages) for a single analysis.
-    Returns extracted item names and quantities that can be matched to existing inventory.
+    Key a page's result by the model, the full system prompt (which embeds the
+    property's item list) and the image, so any change to them misses the cache
     """
-    require_property_access(property_id, current_user)
+    digest = hashlib.sha256()
+    for part in (VISION_MODEL.encode(), system_prompt.encode(), jpeg_bytes):
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+def _get_cached_vision_result(key: str) -> Optional[list]:
+    entry = _vision_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, result = entry
+    if time.monotonic() - stored_at > VISION_CACHE_TTL_SECONDS:
+        del _vision_cache[key]
+        return None
+    _vision_cache.move_to_end(key)
+    return result
 
-    if not settings.OPENAI_API_KEY:
-        raise HTTPException(
-            status_code=400,
-            detail="OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file."
-        )
 
-    # Get existing inventory items for this property
-    inventory_items = db.query(InventoryItem).filter(
-        InventoryItem.property_id == property_id,
-        InventoryItem.is_active == True
-    ).all()
+def _cache_vision_result(key: str, result: list) -> None:
+    _vision_cache[key] = (time.monotonic(), result)
+    _vision_cache.move_to_end(key)
+    while len(_vision_cache) > VISION_CACHE_MAX_ENTRIES:
+        _vision_cache.popitem(last=False)
 
-    if not inventory_items:
-        raise HTTPException(status_code=400, detail="No inventory items found for this property")
 
-    # Build a list of inventory item names for context
-    item_list = "\n".join([f"- {item.name} (ID: {item.id}, Unit: {item.unit})" for item in inventory_items])
+async def iter_ai_json_array(deltas: AsyncIterator[str]) -> AsyncIterator:
+    """
+    Incrementally parse the first JSON array in a streamed model response,
+    yielding each element as soon as it is complete. Text before the opening
+    "[" (such as a wrapping object's key) is skipped, and reading stops at the
+    closing "]".
+    Raises json.JSONDecodeError if the stream ends before the array closes.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    in_array = False
+    async for delta in deltas:
+        buffer += delta
+        if not in_array:
+            start = buffer.find("[")
+            if start == -1:
+                continue
+            buffer = buffer[start + 1:]
+            in_array = True
+
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if not buffer:
+                break
+            if buffer[0] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break
+            # A number at the end of the buffer may still be missing digits
+            if end == len(buffer) and buffer[0] not in '{["':
+                break
+            yield element
+            buffer = buffer[end:]
+
+    raise json.JSONDecodeError("AI response ended before the JSON array closed", buffer, 0)
 
-    try:
-        import httpx
-        from PIL import Image
-        import pillow_heif
-        import fitz  # PyMuPDF for PDF support
 
-        # Register HEIF opener with Pillow
-        pillow_heif.register_heif_opener()
+async def read_ai_json_object(deltas: AsyncIterator[str]) -> Any:
+    """
+    Read a streamed model response up to the end of its JSON value and parse it.
+    Reading stops once the text so far parses completely, so a "}" inside a
+    string (such as a user-typed label) doesn't end the response early.
+    Raises json.JSONDecodeError if the stream ends before the value is complete.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        if "}" not in delta:
+            continue
+        try:
+            value, _ = decoder.raw_decode(buffer.lstrip())
+        except json.JSONDecodeError:
+            continue
+        return value
+    return json.loads(buffer)
+
 
-        # Build the prompt
-        system_prompt = """You are an inventory counting assistant. Your task is to analyze a photo of a handwritten or printed inventory count sheet and extract item names with their counted quantities.
+COUNT_SHEET_PROMPT_TEMPLATE = """You are an inventory counting assistant. Your task is to analyze a photo of a handwritten or printed inventory count sheet and extract item names with their counted quantities.
 
 The inventory items in this system are:
 {item_list}
 
-Your response MUST be a valid JSON array with the following format:
-[
+Your response MUST be a valid JSON object with the following format:
+{{"counts": [
   {{"item_id": 123, "item_name": "Item Name", "quantity": 10.5, "confidence": 0.85, "notes": "optional notes about this count"}},
   ...
-]
+]}}
 
 CRITICAL INSTRUCTIONS FOR HANDLING BLANK/CROSSED OUT ITEMS:
 1. If an item's count field is BLANK (empty, no number written) - SKIP THIS ITEM ENTIRELY. Do NOT include it in your response. Do NOT assume 0.
@@ -509,15 +689,206 @@ CONFIDENCE SCORE GUIDELINES (be honest and accurate):
 
 IMPORTANT: The quantity field accepts decimals. A count of "1.5" means one and a half units - this is common in inventory. Never interpret ".5" as "5" - that would be a decimal point before the 5.
 
-Return ONLY the JSON array, no other text. Only include items where you can see a number written - skip all blank entries."""
+Return ONLY the JSON object, no other text. Only include items where you can see a number written - skip all blank entries."""
+
+# Structured output schema for count sheets; the model's reply is guaranteed to match it
+COUNT_SHEET_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "count_sheet",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "counts": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "item_id": {"type": ["integer", "null"]},
+                            "item_name": {"type": "string"},
+                            "quantity": {"type": "number"},
+                            "confidence": {"type": "number"},
+                            "notes": {"type": ["string", "null"]}
+                        },
+                        "required": ["item_id", "item_name", "quantity", "confidence", "notes"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["counts"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Active item catalog per property, used as AI prompt context:
+# property_id -> (catalog_version, [(id, name, unit), ...], count-sheet prompt)
+_catalog_cache: Dict[int, Tuple[tuple, list, Optional[str]]] = {}
+
+
+def get_property_catalog(property_id: int, db: Session) -> Tuple[list, Optional[str]]:
+    """
+    Return the property's active items as (id, name, unit) rows, plus the count-sheet
+    system prompt with the item list filled in (None if there are no active items).
+    Both are cached per property and reloaded only when the active items change
+    (item count, newest id or latest updated_at), checked with one aggregate query.
+    """
+    active_filter = (InventoryItem.property_id == property_id, InventoryItem.is_active == True)
+    catalog_version = tuple(db.query(
+        func.count(InventoryItem.id),
+        func.max(InventoryItem.id),
+        func.max(InventoryItem.updated_at)
+    ).filter(*active_filter).one())
+
+    cached = _catalog_cache.get(property_id)
+    if cached and cached[0] == catalog_version:
+        return cached[1], cached[2]
+
+    items = []
+    system_prompt = None
+    if catalog_version[0]:
+        items = [tuple(row) for row in db.query(
+            InventoryItem.id, InventoryItem.name, InventoryItem.unit
+        ).filter(*active_filter).all()]
+
+        # Build a list of inventory item names for context
+        item_list = "\n".join([f"- {name} (ID: {item_id}, Unit: {unit})" for item_id, name, unit in items])
+        system_prompt = COUNT_SHEET_PROMPT_TEMPLATE.format(item_list=item_list)
+
+    _catalog_cache[property_id] = (catalog_version, items, system_prompt)
+    return items, system_prompt
 
-        # Collect all image data (bytes, media_type) to process
-        # This allows us to handle PDFs by extracting pages as images
-        image_data_list = []  # List of (bytes, media_type, page_label)
 
-        for img in images:
-            content = await img.read()
+def get_count_sheet_prompt(property_id: int, db: Session) -> Optional[str]:
+    """Return the (cached) count-sheet system prompt, or None if the property has no active items"""
+    return get_property_catalog(property_id, db)[1]
+
+
+def _encode_vision_jpeg(image) -> bytes:
+    """
+    Downscale a PIL image to the size OpenAI Vision would reduce it to
+    (VISION_MAX_DIMENSION, VISION_MAX_SHORT_SIDE) and encode it as JPEG
+    """
+    from PIL import Image
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    width, height = image.size
+    scale = min(1.0, VISION_MAX_DIMENSION / max(width, height), VISION_MAX_SHORT_SIDE / min(width, height))
+    if scale < 1.0:
+        image.thumbnail((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    jpeg_buffer = io.BytesIO()
+    # Progressive encoding usually shaves a few percent off the upload at no quality cost
+    image.save(jpeg_buffer, format='JPEG', quality=VISION_JPEG_QUALITY, optimize=True, progressive=True)
+    return jpeg_buffer.getvalue()
+
+
+def prepare_vision_image(source: Union[bytes, BinaryIO]) -> bytes:
+    """
+    Convert an uploaded photo (JPEG, PNG, HEIC, ...) to a resized JPEG for OpenAI Vision.
+    `source` is the raw bytes or a binary file object, e.g. UploadFile.file, which is
+    decoded in place without first copying the upload into memory.
+    """
+    from PIL import Image
+    import pillow_heif
+
+    # Register HEIF opener with Pillow
+    pillow_heif.register_heif_opener()
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    # Closing the source image frees its decoded pixels as soon as the JPEG is written
+    with Image.open(source) as image:
+        return _encode_vision_jpeg(image)
+
+
+def count_pdf_pages(pdf_content: bytes) -> int:
+    """Return the number of pages in a PDF"""
+    import fitz  # PyMuPDF
+
+    pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+    try:
+        return len(pdf_doc)
+    finally:
+        pdf_doc.close()
+
+
+def render_pdf_page_for_vision(pdf_content: bytes, page_num: int) -> bytes:
+    """Render a single PDF page to a resized JPEG for OpenAI Vision"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+    try:
+        page = pdf_doc[page_num]
+        # Scale to the page's size rather than a fixed 2x; no alpha channel needed
+        scale = pdf_render_scale(page)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+        image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        return _encode_vision_jpeg(image)
+    finally:
+        pdf_doc.close()
+
 
+async def render_pdf_for_vision(pdf_content: bytes, max_pages: Optional[int] = None) -> List[bytes]:
+    """
+    Render the pages of a PDF (up to `max_pages`) to resized JPEGs for OpenAI Vision.
+    Pages render in worker threads, in parallel, to keep the event loop free.
+    """
+    page_count = await asyncio.to_thread(count_pdf_pages, pdf_content)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    return await asyncio.gather(*[
+        asyncio.to_thread(render_pdf_page_for_vision, pdf_content, page_num)
+        for page_num in range(page_count)
+    ])
+
+
+def vision_image_content(jpeg_bytes: bytes) -> dict:
+    """Build an OpenAI image_url message part for a JPEG"""
+    b64_content = base64.b64encode(jpeg_bytes).decode('ascii')
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:image/jpeg;base64,{b64_content}",
+            "detail": "high"
+        }
+    }
+
+
+@router.post("/analyze-photos")
+async def analyze_inventory_photos(
+    property_id: int,
+    images: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Analyze uploaded photos of inventory count sheets using OpenAI Vision.
+    Supports multiple images (pages) for a single analysis.
+    Returns extracted item names and quantities that can be matched to existing inventory.
+    """
+    require_property_access(property_id, current_user)
+
+    if not settings.OPENAI_API_KEY:
+        raise HTTPException(
+            status_code=400,
+            detail="OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file."
+        )
+
+    # Build the prompt (with the property's item list), reusing the cached copy
+    # while the property's active items are unchanged. Session calls block, so in
+    # async endpoints they run in a worker thread to keep the event loop free.
+    system_prompt = await asyncio.to_thread(get_count_sheet_prompt, property_id, db)
+    if system_prompt is None:
+        raise HTTPException(status_code=400, detail="No inventory items found for this property")
+
+    try:
+        import httpx
+
+        async def convert_upload(img):
+            """Convert one upload to resized JPEGs, returned as (jpeg_bytes, page_label) pairs"""
             # Determine file extension
             ext = ""
             if img.filename:
@@ -526,58 +897,48 @@ Return ONLY the JSON array, no other text. Only include items where you can see
             # Handle PDF files - extract each page as an image
             if ext == 'pdf':
                 try:
-                    pdf_doc = fitz.open(stream=content, filetype="pdf")
-                    for page_num in range(len(pdf_doc)):
-                        page = pdf_doc[page_num]
-                        # Render page at 2x resolution for better quality (150 DPI -> 300 DPI effective)
-                        mat = fitz.Matrix(2.0, 2.0)
-                        pix = page.get_pixmap(matrix=mat)
-                        # Convert to PNG bytes
-                        png_bytes = pix.tobytes("png")
-                        image_data_list.append((png_bytes, "image/png", f"{img.filename} page {page_num + 1}"))
-                    pdf_doc.close()
+                    # PyMuPDF needs the whole document in memory; each page render shares these bytes
+                    content = await img.read()
+                    page_images = await render_pdf_for_vision(content)
                 except Exception as pdf_error:
                     raise HTTPException(
                         status_code=400,
                         detail=f"Failed to process PDF '{img.filename}': {str(pdf_error)}"
                     )
-            # Handle HEIC/HEIF conversion to JPEG
-            elif ext in ('heic', 'heif'):
-                heic_image = Image.open(io.BytesIO(content))
-                if heic_image.mode in ('RGBA', 'P'):
-                    heic_image = heic_image.convert('RGB')
-                jpeg_buffer = io.BytesIO()
-                heic_image.save(jpeg_buffer, format='JPEG', quality=90)
-                image_data_list.append((jpeg_buffer.getvalue(), "image/jpeg", img.filename))
-            else:
-                # Determine media type for other formats
-                media_type = "image/jpeg"
-                if ext == 'png':
-                    media_type = "image/png"
-                elif ext == 'gif':
-                    media_type = "image/gif"
-                elif ext == 'webp':
-                    media_type = "image/webp"
-                image_data_list.append((content, media_type, img.filename))
+                return [
+                    (jpeg_bytes, f"{img.filename} page {page_num + 1}")
+                    for page_num, jpeg_bytes in enumerate(page_images)
+                ]
+
+            # Photos (including HEIC/HEIF) are decoded straight from the upload's
+            # spooled file, then downscaled and re-encoded as JPEG
+            jpeg_bytes = await asyncio.to_thread(prepare_vision_image, img.file)
+            return [(jpeg_bytes, img.filename)]
+
+        # Collect all images as resized JPEGs to process, converting the uploads in
+        # parallel worker threads. This allows us to handle PDFs by extracting pages as images.
+        converted = await asyncio.gather(*[convert_upload(img) for img in images])
+        image_data_list = [page for pages in converted for page in pages]  # List of (jpeg_bytes, page_label)
 
         # Process pages in PARALLEL to avoid timeout
         all_extracted_counts = []
         total_pages = len(image_data_list)
 
-        async def process_single_page(client, img_index, img_bytes, media_type, page_label):
+        # Shared by every page's request
+        system_message = {"role": "system", "content": system_prompt}
+
+        async def process_single_page(img_index, img_bytes, page_label):
             """Process a single page and return extracted counts"""
-            b64_content = base64.b64encode(img_bytes).decode('utf-8')
+            cache_key = _vision_cache_key(system_prompt, img_bytes)
+            cached = _get_cached_vision_result(cache_key)
+            if cached is not None:
+                print(f"Reusing {len(cached)} cached items for {page_label}")
+                return cached
 
-            image_content = {
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:{media_type};base64,{b64_content}",
-                    "detail": "high"
-                }
-            }
+            image_content = vision_image_content(img_bytes)
 
             messages = [
-                {"role": "system", "content": system_prompt.format(item_list=item_list)},
+                system_message,
                 {
                     "role": "user",
                     "content": [
@@ -588,43 +949,21 @@ Return ONLY the JSON array, no other text. Only include items where you can see
             ]
 
             try:
-                response = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "gpt-4o",
-                        "messages": messages,
-                        "max_completion_tokens": 4096,
-                        "temperature": 0.1
-                    },
-                    timeout=120.0
-                )
-
-                if response.status_code != 200:
-                    print(f"OpenAI API error on {page_label}: {response.status_code}")
-                    return []
-
-                result = response.json()
-                response_content = result['choices'][0]['message']['content']
-
-                # Try to parse the JSON from the response
-                # Remove markdown code blocks if present
-                response_content = response_content.strip()
-                if response_content.startswith('```json'):
-                    response_content = response_content[7:]
-                if response_content.startswith('```'):
-                    response_content = response_content[3:]
-                if response_content.endswith('```'):
-                    response_content = response_content[:-3]
-                response_content = response_content.strip()
-
-                page_counts = json.loads(response_content)
-                if isinstance(page_counts, list):
-                    print(f"Successfully extracted {len(page_counts)} items from {page_label}")
-                    return page_counts
+                response_content = await stream_chat_completion({
+                    "model": VISION_MODEL,
+                    "messages": messages,
+                    "max_completion_tokens": 4096,
+                    "temperature": 0.1,
+                    "response_format": COUNT_SHEET_RESPONSE_FORMAT
+                }, timeout=120.0)
+
+                # Structured outputs guarantee the reply matches the schema
+                page_counts = orjson.loads(response_content)["counts"]
+                print(f"Successfully extracted {len(page_counts)} items from {page_label}")
+                _cache_vision_result(cache_key, page_counts)
+                return page_counts
+            except OpenAIAPIError as e:
+                print(f"OpenAI API error on {page_label}: {e.status_code}")
                 return []
             except json.JSONDecodeError as e:
                 print(f"Failed to parse AI response for {page_label}: {str(e)}")
@@ -634,30 +973,21 @@ Return ONLY the JSON array, no other text. Only include items where you can see
                 return []
 
         # Process all pages in parallel
-        import asyncio
-        async with httpx.AsyncClient() as client:
-            tasks = [
-                process_single_page(client, idx, img_bytes, media_type, page_label)
-                for idx, (img_bytes, media_type, page_label) in enumerate(image_data_list)
-            ]
-            results = await asyncio.gather(*tasks)
-            for page_counts in results:
-                all_extracted_counts.extend(page_counts)
+        tasks = [
+            process_single_page(idx, img_bytes, page_label)
+            for idx, (img_bytes, page_label) in enumerate(image_data_list)
+        ]
+        results = await asyncio.gather(*tasks)
+        for page_counts in results:
+            all_extracted_counts.extend(page_counts)
 
-        # Merge duplicates: if same item_id appears multiple times, keep the one with higher confidence
+        # Merge duplicates: if same item_id appears multiple times, keep the one with higher confidence.
+        # The sort is stable, so on a tie the count from the earlier page wins.
         merged_counts = {}
-        for count in all_extracted_counts:
+        for count in sorted(all_extracted_counts, key=lambda c: c.get('confidence', 0), reverse=True):
             item_id = count.get('item_id')
-            if item_id is None:
-                continue
-            if item_id not in merged_counts:
-                merged_counts[item_id] = count
-            else:
-                # Keep the one with higher confidence
-                existing_confidence = merged_counts[item_id].get('confidence', 0)
-                new_confidence = count.get('confidence', 0)
-                if new_confidence > existing_confidence:
-                    merged_counts[item_id] = count
+            if item_id is not None:
+                merged_counts.setdefault(item_id, count)
 
         extracted_counts = list(merged_counts.values())
 
@@ -678,6 +1008,69 @@ Return ONLY the JSON array, no other text. Only include items where you can see
 
 VALID_CATEGORIES = ['Bakery', 'Beverages', 'Cleaning Supplies', 'Condiments', 'Dairy', 'Dry Goods', 'Frozen', 'Packaged Snacks', 'Paper & Plastic Goods', 'Produce', 'Protein', 'Spices', 'Other']
 VALID_UNITS = ['Each', 'Lb', 'Oz', 'Gallon', 'Quart', 'Pint', 'Case', 'Box', 'Bag', 'Dozen', 'Bunch', 'Head', 'Jar', 'Can', 'Bottle', 'Pack', 'Roll', 'Sheet', 'Unit']
+# Lists above keep their order for the prompt; membership checks use these
+_VALID_CATEGORY_SET = frozenset(VALID_CATEGORIES)
+_VALID_UNIT_SET = frozenset(VALID_UNITS)
+
+# Built once: the seed prompt has no per-request parts (duplicates are filtered
+# after extraction rather than by listing existing items)
+_CATEGORIES_STR = ", ".join(VALID_CATEGORIES)
+_UNITS_STR = ", ".join(VALID_UNITS)
+SEED_SYSTEM_PROMPT = f"""You are an inventory extraction assistant. Your task is to analyze photos of inventory sheets and extract ALL item names you can see.
+
+IMPORTANT: This is for SEEDING a new inventory list, not for counting quantities. Focus on extracting ITEM NAMES only.
+
+The valid categories are: {_CATEGORIES_STR}
+The valid units are: {_UNITS_STR}
+
+Your response MUST be a valid JSON object with the following format:
+{{"items": [
+  {{"name": "Item Name", "unit": "unit type", "category": "Category Name", "par_level": null}},
+  ...
+]}}
+
+Instructions:
+1. Extract EVERY item name you can read from the inventory sheet(s) - items already in the inventory are filtered out afterwards
+2. For each item, try to determine:
+   - name: The item name (be specific, e.g., "Whole Milk" not just "Milk")
+   - unit: MUST be one of these valid units: {_UNITS_STR}. Choose the most appropriate unit based on the item type. Default to "Each" if not visible or uncertain.
+   - category: Assign to one of these categories: {_CATEGORIES_STR}. Use your best judgment based on the item name.
+   - par_level: Leave as null unless you can clearly see a par level number
+3. Be thorough - extract ALL items visible in the photos
+4. Return ONLY the JSON object, no other text"""
+# Shared by every page's request
+_SEED_SYSTEM_MESSAGE = {"role": "system", "content": SEED_SYSTEM_PROMPT}
+
+# Structured output schema for seeded items; category and unit are limited to the valid values
+SEED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "inventory_items",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "unit": {"type": "string", "enum": VALID_UNITS},
+                            "category": {"type": "string", "enum": VALID_CATEGORIES},
+                            "par_level": {"type": ["number", "null"]}
+                        },
+                        "required": ["name", "unit", "category", "par_level"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["items"],
+            "additionalProperties": False
+        }
+    }
+}
+
 
 @router.post("/seed-from-photo")
 async def seed_inventory_from_photo(
@@ -698,248 +1091,142 @@ async def seed_inventory_from_photo(
         )
 
     # Verify property exists
-    prop = db.query(Property).filter(Property.id == property_id).first()
+    prop = await asyncio.to_thread(db.get, Property, property_id)
     if not prop:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    # Get existing inventory items for this property (for duplicate checking)
-    existing_items = db.query(InventoryItem).filter(
-        InventoryItem.property_id == property_id,
-        InventoryItem.is_active == True
-    ).all()
-
-    existing_names = [item.name.lower().strip() for item in existing_items]
-    existing_items_list = "\n".join([f"- {item.name}" for item in existing_items]) if existing_items else "No existing items"
+    # Get existing inventory item names for this property (for duplicate checking).
+    # Duplicates are filtered here rather than by listing every item in the prompt.
+    existing_items, _ = await asyncio.to_thread(get_property_catalog, property_id, db)
+    existing_names = NameMatchIndex(name for _, name, _ in existing_items)
 
     try:
         import httpx
-        from PIL import Image
-        import pillow_heif
-
-        # Register HEIF opener with Pillow
-        pillow_heif.register_heif_opener()
-
-        # Helper function to convert PDF to images (same as in admin.py)
-        def convert_pdf_to_images(pdf_content: bytes) -> list:
-            """Convert PDF pages to base64-encoded PNG images for OpenAI Vision API"""
-            import fitz  # PyMuPDF
-
-            pdf_images = []
-            pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
-
-            for page_num in range(len(pdf_doc)):
-                page = pdf_doc[page_num]
-                # Render at 2x resolution for better OCR
-                mat = fitz.Matrix(2.0, 2.0)
-                pix = page.get_pixmap(matrix=mat)
-
-                # Convert to PNG bytes
-                img_bytes = pix.tobytes("png")
-                img_base64 = base64.b64encode(img_bytes).decode("utf-8")
-                pdf_images.append(img_base64)
-
-                # Limit to first 10 pages for inventory sheets
-                if page_num >= 9:
-                    break
-
-            pdf_doc.close()
-            return pdf_images
-
-        # Encode images to base64
-        image_contents = []
-        for img in images:
-            content = await img.read()
 
+        async def convert_upload(img):
+            """Convert one upload to resized JPEGs, one per page"""
             # Determine file extension
             ext = ""
             if img.filename:
                 ext = img.filename.lower().split('.')[-1]
 
-            # Handle PDF files - convert pages to images
+            # Handle PDF files - convert pages to images (first 10 pages for inventory sheets)
             if ext == 'pdf':
                 try:
-                    pdf_page_images = convert_pdf_to_images(content)
-                    for page_b64 in pdf_page_images:
-                        image_contents.append({
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{page_b64}",
-                                "detail": "high"
-                            }
-                        })
-                    continue  # Skip to next file
+                    # PyMuPDF needs the whole document in memory; each page render shares these bytes
+                    content = await img.read()
+                    return await render_pdf_for_vision(content, max_pages=SEED_PDF_MAX_PAGES)
                 except Exception as pdf_err:
                     raise HTTPException(
                         status_code=400,
                         detail=f"Failed to process PDF file: {str(pdf_err)}"
                     )
 
-            # Handle HEIC/HEIF conversion to JPEG
-            if ext in ('heic', 'heif'):
-                heic_image = Image.open(io.BytesIO(content))
-                if heic_image.mode in ('RGBA', 'P'):
-                    heic_image = heic_image.convert('RGB')
-                jpeg_buffer = io.BytesIO()
-                heic_image.save(jpeg_buffer, format='JPEG', quality=90)
-                content = jpeg_buffer.getvalue()
-                media_type = "image/jpeg"
-            else:
-                media_type = "image/jpeg"
-                if ext == 'png':
-                    media_type = "image/png"
-                elif ext == 'gif':
-                    media_type = "image/gif"
-                elif ext == 'webp':
-                    media_type = "image/webp"
-
-            b64_content = base64.b64encode(content).decode('utf-8')
-            image_contents.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:{media_type};base64,{b64_content}",
-                    "detail": "high"
-                }
-            })
+            # Photos (including HEIC/HEIF) are decoded straight from the upload's
+            # spooled file, then downscaled and re-encoded as JPEG
+            return [await asyncio.to_thread(prepare_vision_image, img.file)]
 
-        categories_list = ", ".join(VALID_CATEGORIES)
-        units_list = ", ".join(VALID_UNITS)
+        # Convert uploads to resized JPEGs, one per page, converting the uploads
+        # in parallel worker threads
+        converted = await asyncio.gather(*[convert_upload(img) for img in images])
+        page_images = [jpeg_bytes for pages in converted for jpeg_bytes in pages]
 
-        # Build the prompt for extracting inventory items
-        system_prompt = f"""You are an inventory extraction assistant. Your task is to analyze photos of inventory sheets and extract ALL item names you can see.
-
-IMPORTANT: This is for SEEDING a new inventory list, not for counting quantities. Focus on extracting ITEM NAMES only.
+        total_pages = len(page_images)
 
-The valid categories are: {categories_list}
-The valid units are: {units_list}
+        async def process_single_page(img_index, jpeg_bytes):
+            """Extract items from a single page"""
+            cache_key = _vision_cache_key(SEED_SYSTEM_PROMPT, jpeg_bytes)
+            cached = _get_cached_vision_result(cache_key)
+            if cached is not None:
+                return cached
 
-Existing items in this camp's inventory (DO NOT include these - they already exist):
-{existing_items_list}
-
-Your response MUST be a valid JSON array with the following format:
-[
-  {{"name": "Item Name", "unit": "unit type", "category": "Category Name", "par_level": null}},
-  ...
-]
-
-Instructions:
-1. Extract EVERY item name you can read from the inventory sheet(s)
-2. DO NOT include items that already exist in the existing items list above (check carefully for matches)
-3. For each item, try to determine:
-   - name: The item name (be specific, e.g., "Whole Milk" not just "Milk")
-   - unit: MUST be one of these valid units: {units_list}. Choose the most appropriate unit based on the item type. Default to "each" if not visible or uncertain.
-   - category: Assign to one of these categories: {categories_list}. Use your best judgment based on the item name.
-   - par_level: Leave as null unless you can clearly see a par level number
-4. Be thorough - extract ALL items visible in the photos
-5. Skip any item that closely matches an existing item name (even if spelled slightly differently)
-6. Return ONLY the JSON array, no other text"""
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "Please analyze these inventory sheet photos and extract all item names. Return only valid JSON array of items."},
-                    *image_contents
-                ]
-            }
-        ]
+            image_content = vision_image_content(jpeg_bytes)
+            messages = [
+                _SEED_SYSTEM_MESSAGE,
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": f"Please analyze this inventory sheet photo (page {img_index + 1} of {total_pages}) and extract all item names. Return only a valid JSON object with the items."},
+                        image_content
+                    ]
+                }
+            ]
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o",
+            # Items are parsed one by one from the "items" array while the response streams in
+            try:
+                async with aclosing(iter_chat_completion({
+                    "model": VISION_MODEL,
                     "messages": messages,
                     "max_completion_tokens": 16384,  # Increased to handle large inventory sheets (100+ items)
-                    "temperature": 0.1
-                },
-                timeout=180.0  # Increased timeout for larger responses
-            )
-
-            if response.status_code != 200:
-                error_detail = response.json() if response.content else "Unknown error"
+                    "temperature": 0.1,
+                    "response_format": SEED_RESPONSE_FORMAT
+                }, timeout=180.0)) as deltas:  # Increased timeout for larger responses
+                    page_items = [item async for item in iter_ai_json_array(deltas) if isinstance(item, dict)]
+            except OpenAIAPIError as e:
                 raise HTTPException(
                     status_code=500,
-                    detail=f"OpenAI API error: {error_detail}"
+                    detail=f"OpenAI API error: {e.detail}"
                 )
-
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-
-            # Parse JSON from response
-            content = content.strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-            content = content.strip()
-
-            try:
-                extracted_items = json.loads(content)
             except json.JSONDecodeError as e:
                 raise HTTPException(
                     status_code=500,
-                    detail=f"Failed to parse AI response as JSON: {str(e)}. Raw response: {content[:500]}"
+                    detail=f"Failed to parse AI response as JSON: {e.msg}. Unparsed response: {e.doc[:500]}"
                 )
 
-            # Filter out duplicates (double-check against existing items)
-            new_items = []
-            skipped_duplicates = []
-
-            for item in extracted_items:
-                item_name = item.get('name', '').strip()
-                if not item_name:
-                    continue
-
-                # Check for duplicates (case-insensitive)
-                item_name_lower = item_name.lower()
-                is_duplicate = False
-
-                for existing_name in existing_names:
-                    # Check for exact match or very similar names
-                    if item_name_lower == existing_name or \
-                       item_name_lower in existing_name or \
-                       existing_name in item_name_lower:
-                        is_duplicate = True
-                        skipped_duplicates.append(item_name)
-                        break
-
-                if not is_duplicate:
-                    # Validate category
-                    category = item.get('category', 'Other')
-                    if category not in VALID_CATEGORIES:
-                        category = 'Other'
-
-                    # Validate unit
-                    unit = item.get('unit', 'each')
-                    if unit not in VALID_UNITS:
-                        unit = 'each'
-
-                    new_items.append({
-                        "name": item_name,
-                        "unit": unit,
-                        "category": category,
-                        "par_level": item.get('par_level')
-                    })
-                    # Add to existing names to prevent duplicates within this batch
-                    existing_names.append(item_name_lower)
-
-            return {
-                "success": True,
-                "property_id": property_id,
-                "property_name": prop.name,
-                "extracted_items": new_items,
-                "skipped_duplicates": skipped_duplicates,
-                "total_extracted": len(new_items),
-                "total_skipped": len(skipped_duplicates),
-                "images_processed": len(images)
-            }
+            _cache_vision_result(cache_key, page_items)
+            return page_items
+
+        # Process all pages in parallel; results come back in page order
+        results = await asyncio.gather(*[
+            process_single_page(idx, jpeg_bytes)
+            for idx, jpeg_bytes in enumerate(page_images)
+        ])
+        extracted_items = [item for page_items in results for item in page_items]
+
+        # Filter out duplicates (double-check against existing items)
+        new_items = []
+        skipped_duplicates = []
+
+        for item in extracted_items:
+            item_name = item.get('name', '').strip()
+            if not item_name:
+                continue
+
+            # Check for duplicates (case-insensitive): exact matches and names
+            # contained in one another
+            if existing_names.matches(item_name):
+                skipped_duplicates.append(item_name)
+            else:
+                # Validate category
+                category = item.get('category', 'Other')
+                if category not in _VALID_CATEGORY_SET:
+                    category = 'Other'
+
+                # Validate unit
+                unit = item.get('unit', 'each')
+                if unit not in _VALID_UNIT_SET:
+                    unit = 'each'
+
+                new_items.append({
+                    "name": item_name,
+                    "unit": unit,
+                    "category": category,
+                    "par_level": item.get('par_level')
+                })
+                # Add to existing names to prevent duplicates within this batch
+                existing_names.add(item_name)
+
+        return {
+            "success": True,
+            "property_id": property_id,
+            "property_name": prop.name,
+            "extracted_items": new_items,
+            "skipped_duplicates": skipped_duplicates,
+            "total_extracted": len(new_items),
+            "total_skipped": len(skipped_duplicates),
+            "images_processed": len(images),
+            "pages_processed": total_pages
+        }
 
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"HTTP error calling OpenAI: {str(e)}")
@@ -948,7 +1235,7 @@ Instructions:
 
 
 @router.post("/seed-confirm")
-async def confirm_seed_inventory(
+def confirm_seed_inventory(
     property_id: int,
     items: List[dict],
     current_user: User = Depends(require_admin),
@@ -963,13 +1250,15 @@ async def confirm_seed_inventory(
     if not prop:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    # Get existing items again to double-check for duplicates
-    existing_items = db.query(InventoryItem).filter(
-        InventoryItem.property_id == property_id,
-        InventoryItem.is_active == True
-    ).all()
-    existing_names = set(item.name.lower().strip() for item in existing_items)
+    # Get existing names again to double-check for duplicates (normalized in the query)
+    existing_names = {
+        name for (name,) in db.query(func.lower(func.trim(InventoryItem.name))).filter(
+            InventoryItem.property_id == property_id,
+            InventoryItem.is_active == True
+        )
+    }
 
+    new_rows = []
     created_items = []
     skipped_items = []
 
@@ -985,30 +1274,32 @@ async def confirm_seed_inventory(
 
         # Validate category
         category = item_data.get('category', 'Other')
-        if category not in VALID_CATEGORIES:
+        if category not in _VALID_CATEGORY_SET:
             category = 'Other'
 
         # Validate unit
         unit = item_data.get('unit', 'each')
-        if unit not in VALID_UNITS:
+        if unit not in _VALID_UNIT_SET:
             unit = 'each'
 
-        # Create the inventory item
-        new_item = InventoryItem(
-            property_id=property_id,
-            name=item_name,
-            unit=unit,
-            category=category,
-            par_level=item_data.get('par_level'),
-            current_stock=0,
-            is_recurring=True,  # Default to recurring since it's from an existing inventory sheet
-            is_active=True,
-            supplier_id=None  # No supplier info from photo
-        )
-        db.add(new_item)
+        # Row for the inventory item; all rows are inserted together below
+        new_rows.append({
+            "property_id": property_id,
+            "name": item_name,
+            "unit": unit,
+            "category": category,
+            "par_level": item_data.get('par_level'),
+            "current_stock": 0,
+            "is_recurring": True,  # Default to recurring since it's from an existing inventory sheet
+            "is_active": True,
+            "supplier_id": None  # No supplier info from photo
+        })
         created_items.append(item_name)
         existing_names.add(item_name.lower())
 
+    if new_rows:
+        # One multi-row INSERT instead of flushing an ORM object per item
+        db.execute(insert(InventoryItem), new_rows)
     db.commit()
 
     return {
@@ -1024,30 +1315,16 @@ async def confirm_seed_inventory(
 
 # ============== AI-POWERED INVENTORY SORTING ==============
 
-async def _sort_category_with_ai(items: List[InventoryItem], category: str, subcategory: Optional[str] = None) -> List[int]:
-    """
-    Use AI to sort items within a category/subcategory logically.
-    Returns list of item IDs in the optimal order.
-    """
-    import httpx
-
-    if not settings.OPENAI_API_KEY:
-        # Fallback to alphabetical if no API key
-        return [item.id for item in sorted(items, key=lambda x: x.name.lower())]
-
-    if not items:
-        return []
-
-    # Build list of items for AI
-    item_names = [{"id": item.id, "name": item.name} for item in items]
-
-    category_desc = f"{category}"
-    if subcategory:
-        category_desc = f"{category} > {subcategory}"
+# Cap on sort requests sent to OpenAI at the same time, to stay under rate limits
+AI_SORT_CONCURRENCY = 8
+# Categories are sorted together in one request, up to this many items per request
+AI_SORT_BATCH_MAX_ITEMS = 200
+# Groups this small are just sorted alphabetically; the AI has nothing to group
+AI_SORT_MIN_ITEMS = 3
 
-    system_prompt = f"""You are an inventory organization assistant. Your task is to sort food/supply inventory items within a category in a logical order that groups similar items together.
+AI_SORT_SYSTEM_PROMPT = """You are an inventory organization assistant. Your task is to sort food/supply inventory items within each category in a logical order that groups similar items together.
 
-Category: {category_desc}
+You will receive a JSON object mapping each category (as "Category" or "Category > Subcategory") to its items.
 
 Rules for sorting:
 1. Group similar products together (e.g., all sliced cheeses together, all pies together, all canned goods by type)
@@ -1058,62 +1335,206 @@ Rules for sorting:
 6. For proteins: group by type (beef, chicken, pork, fish, etc.)
 7. For condiments: group by type (sauces, dressings, spreads, etc.)
 8. Think about how a camp cook would want to find items quickly
+9. Only reorder items within their own category; never move an item to another category
 
-Return ONLY a JSON array of item IDs in the optimal order, e.g.: [5, 2, 8, 1, 3]
+Return ONLY a JSON object mapping each category to an array of its item IDs in the optimal order, e.g.: {"Dairy": [5, 2, 8], "Produce > Fruit": [1, 3]}
 Do not include any other text or explanation."""
 
-    user_content = f"Please sort these {len(item_names)} inventory items in a logical order:\n\n"
-    user_content += json.dumps(item_names, indent=2)
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o",
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_content}
-                    ],
-                    "max_completion_tokens": 4096,
-                    "temperature": 0.1
-                },
-                timeout=60.0
-            )
 
-            if response.status_code != 200:
-                # Fallback to alphabetical
-                return [item.id for item in sorted(items, key=lambda x: x.name.lower())]
+def _alphabetical_ids(items: List[InventoryItem]) -> List[int]:
+    """Fallback order when AI sorting is unavailable or returns something unusable"""
+    return [item.id for item in sorted(items, key=lambda x: x.name.lower())]
 
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
 
-            # Parse the JSON array
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-            content = content.strip()
+def _sort_group_label(category: str, subcategory: str) -> str:
+    return f"{category} > {subcategory}" if subcategory else category
 
-            sorted_ids = json.loads(content)
 
-            # Validate that all IDs are present
-            item_id_set = set(item.id for item in items)
-            if set(sorted_ids) != item_id_set:
-                # AI returned invalid IDs, fallback to alphabetical
-                return [item.id for item in sorted(items, key=lambda x: x.name.lower())]
+async def _sort_many_categories_with_ai(
+    grouped_items: Dict[Tuple[str, str], List[InventoryItem]]
+) -> Dict[Tuple[str, str], List[int]]:
+    """
+    Use AI to sort items within several (category, subcategory) groups in one request.
+    Returns the item IDs of each group in the optimal order. Groups the AI
+    doesn't return a complete ordering for are left out.
+    """
+    labels = {_sort_group_label(cat, subcat): (cat, subcat) for cat, subcat in grouped_items}
+    payload = {
+        label: [{"id": item.id, "name": item.name} for item in grouped_items[key]]
+        for label, key in labels.items()
+    }
 
-            return sorted_ids
+    user_content = f"Please sort the items in these {len(payload)} categories in a logical order:\n\n"
+    # Compact JSON: indentation only adds prompt tokens
+    user_content += orjson.dumps(payload).decode()
 
+    try:
+        # Stop reading once the reply object is complete; its keys are user-typed
+        # labels, so a "}" alone doesn't mean the object has closed
+        async with aclosing(iter_chat_completion({
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": AI_SORT_SYSTEM_PROMPT},
+                {"role": "user", "content": user_content}
+            ],
+            "max_completion_tokens": 4096,
+            "temperature": 0.1,
+            "response_format": {"type": "json_object"}
+        }, timeout=60.0)) as deltas:
+            sorted_by_label = await read_ai_json_object(deltas)
+        if not isinstance(sorted_by_label, dict):
+            sorted_by_label = {}
     except Exception as e:
         print(f"AI sorting failed: {str(e)}, falling back to alphabetical")
-        return [item.id for item in sorted(items, key=lambda x: x.name.lower())]
+        sorted_by_label = {}
+
+    results = {}
+    for label, key in labels.items():
+        items = grouped_items[key]
+        sorted_ids = sorted_by_label.get(label)
+        # Validate that the AI returned exactly this group's IDs
+        if isinstance(sorted_ids, list) and len(sorted_ids) == len(items) and set(sorted_ids) == {item.id for item in items}:
+            results[key] = sorted_ids
+    return results
+
+
+def _sort_cache_name(item: InventoryItem) -> str:
+    return item.name.casefold().strip()
+
+
+def _sort_cache_key(items: List[InventoryItem]) -> str:
+    """Content address of a group for AISortCache: SHA-256 of its sorted item names"""
+    names = sorted(_sort_cache_name(item) for item in items)
+    return hashlib.sha256("|".join(names).encode("utf-8")).hexdigest()
+
+
+def _ids_in_cached_order(items: List[InventoryItem], ordered_names: list) -> Optional[List[int]]:
+    """Map a cached name order back to this group's item IDs (None if it doesn't fit)"""
+    ids_by_name = defaultdict(list)
+    for item in sorted(items, key=lambda x: x.id):
+        ids_by_name[_sort_cache_name(item)].append(item.id)
+
+    sorted_ids = []
+    for name in ordered_names:
+        ids = ids_by_name.get(name)
+        if not ids:
+            return None
+        sorted_ids.append(ids.pop(0))
+    return sorted_ids if len(sorted_ids) == len(items) else None
+
+
+def _store_sort_cache(
+    db: Session,
+    cache_rows: Dict[str, List[str]],
+    known_keys: set,
+    force: bool
+) -> None:
+    """
+    Save AI orderings to the sort cache.
+    Keys missing from `known_keys` are inserted. Keys already cached are left alone
+    unless `force` is set, in which case their orders are replaced. If a concurrent
+    request cached the same key first, the insert is dropped.
+    """
+    if force:
+        known_keys = {
+            key for (key,) in db.query(AISortCache.key)
+            .filter(AISortCache.key.in_(list(cache_rows)))
+            .all()
+        }
+        for key in known_keys:
+            db.execute(
+                update(AISortCache)
+                .where(AISortCache.key == key)
+                .values(ordered_names=cache_rows[key])
+            )
+
+    new_rows = [
+        {"key": key, "ordered_names": names}
+        for key, names in cache_rows.items() if key not in known_keys
+    ]
+    if not new_rows:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(AISortCache), new_rows)
+    except IntegrityError:
+        pass
+
+
+async def _sort_categories_with_ai(
+    grouped_items: Dict[Tuple[str, str], List[InventoryItem]],
+    db: Session,
+    force: bool = False
+) -> Dict[Tuple[str, str], List[int]]:
+    """
+    Sort several (category, subcategory) groups with AI.
+    Groups with fewer than AI_SORT_MIN_ITEMS items are sorted alphabetically, and
+    groups whose item names were sorted before reuse the cached order. The rest
+    are packed into as few requests as AI_SORT_BATCH_MAX_ITEMS allows, the
+    requests run concurrently, and their results are added to the cache.
+    With force=True the cache is skipped and its orders are replaced by the new ones.
+    Returns the sorted item IDs for each group key.
+    """
+    if not settings.OPENAI_API_KEY:
+        # Fallback to alphabetical if no API key
+        return {key: _alphabetical_ids(items) for key, items in grouped_items.items()}
+
+    results = {
+        key: _alphabetical_ids(items)
+        for key, items in grouped_items.items() if len(items) < AI_SORT_MIN_ITEMS
+    }
+    candidates = {key: items for key, items in grouped_items.items() if key not in results}
+
+    cache_keys = {key: _sort_cache_key(items) for key, items in candidates.items()}
+    cached = {}
+    if cache_keys and not force:
+        cached = dict(await asyncio.to_thread(
+            db.query(AISortCache.key, AISortCache.ordered_names)
+            .filter(AISortCache.key.in_(set(cache_keys.values())))
+            .all
+        ))
+
+    to_sort = {}
+    for key, items in candidates.items():
+        ordered_names = cached.get(cache_keys[key])
+        sorted_ids = _ids_in_cached_order(items, ordered_names) if ordered_names else None
+        if sorted_ids is not None:
+            results[key] = sorted_ids
+        else:
+            to_sort[key] = items
+
+    batches = []
+    batch, batch_size = {}, 0
+    for key, items in to_sort.items():
+        if batch and batch_size + len(items) > AI_SORT_BATCH_MAX_ITEMS:
+            batches.append(batch)
+            batch, batch_size = {}, 0
+        batch[key] = items
+        batch_size += len(items)
+    if batch:
+        batches.append(batch)
+
+    semaphore = asyncio.Semaphore(AI_SORT_CONCURRENCY)
+
+    async def sort_batch(batch: Dict[Tuple[str, str], List[InventoryItem]]) -> Dict[Tuple[str, str], List[int]]:
+        async with semaphore:
+            return await _sort_many_categories_with_ai(batch)
+
+    ai_results = {}
+    for batch_result in await asyncio.gather(*[sort_batch(batch) for batch in batches]):
+        ai_results.update(batch_result)
+
+    # Cache the AI orderings; a forced sort overwrites any order already cached
+    cache_rows = {}
+    for key, sorted_ids in ai_results.items():
+        names_by_id = {item.id: _sort_cache_name(item) for item in to_sort[key]}
+        cache_rows[cache_keys[key]] = [names_by_id[item_id] for item_id in sorted_ids]
+    if cache_rows:
+        await asyncio.to_thread(_store_sort_cache, db, cache_rows, set(cached), force)
+
+    for key, items in to_sort.items():
+        results[key] = ai_results.get(key) or _alphabetical_ids(items)
+    return results
 
 
 @router.post("/sort-category")
@@ -1144,7 +1565,7 @@ async def sort_inventory_category(
     if subcategory:
         query = query.filter(InventoryItem.subcategory == subcategory)
 
-    all_items = query.all()
+    all_items = await asyncio.to_thread(query.all)
 
     if not all_items:
         return {"success": True, "message": "No items to sort", "sorted_categories": []}
@@ -1160,19 +1581,22 @@ async def sort_inventory_category(
     sorted_categories = []
     now = datetime.utcnow()
 
-    for (cat, subcat), items in grouped_items.items():
-        # Check if sorting is needed (any items with last_sorted_at = NULL)
-        needs_sorting = force or any(item.last_sorted_at is None for item in items)
+    # Only sort groups with new items (last_sorted_at = NULL), unless forced
+    groups_to_sort = {
+        key: items for key, items in grouped_items.items()
+        if force or any(item.last_sorted_at is None for item in items)
+    }
 
-        if not needs_sorting:
-            continue
+    # Get AI-sorted order for all groups at once; a forced sort asks the AI afresh
+    sorted_ids_by_group = await _sort_categories_with_ai(groups_to_sort, db, force=force)
 
-        # Get AI-sorted order
-        sorted_ids = await _sort_category_with_ai(items, cat, subcat if subcat else None)
+    for (cat, subcat), items in groups_to_sort.items():
+        sorted_ids = sorted_ids_by_group[(cat, subcat)]
 
         # Update sort_order and last_sorted_at for all items
+        by_id = {i.id: i for i in items}
         for order, item_id in enumerate(sorted_ids, start=1):
-            item = next((i for i in items if i.id == item_id), None)
+            item = by_id.get(item_id)
             if item:
                 item.sort_order = order
                 item.last_sorted_at = now
@@ -1183,7 +1607,7 @@ async def sort_inventory_category(
             "items_sorted": len(sorted_ids)
         })
 
-    db.commit()
+    await asyncio.to_thread(db.commit)
 
     return {
         "success": True,
@@ -1203,31 +1627,40 @@ def get_sorting_status(
     """
     require_property_access(property_id, current_user)
 
-    # Get all recurring items grouped by category
-    items = db.query(InventoryItem).filter(
+    # Count recurring items and unsorted ones (last_sorted_at = NULL) per
+    # category/subcategory in the database instead of loading every item
+    group_counts = db.query(
+        InventoryItem.category,
+        InventoryItem.subcategory,
+        func.count(InventoryItem.id),
+        func.sum(case((InventoryItem.last_sorted_at.is_(None), 1), else_=0))
+    ).filter(
         InventoryItem.property_id == property_id,
         InventoryItem.is_active == True,
         InventoryItem.is_recurring == True
+    ).group_by(
+        InventoryItem.category, InventoryItem.subcategory
+    ).order_by(
+        InventoryItem.category, InventoryItem.subcategory
     ).all()
 
-    # Group by category and check for unsorted items
+    # Roll the groups up by category
     categories = {}
-    for item in items:
-        cat_key = item.category or "Uncategorized"
+    for category, subcategory, total, unsorted in group_counts:
+        cat_key = category or "Uncategorized"
         if cat_key not in categories:
             categories[cat_key] = {"total": 0, "unsorted": 0, "subcategories": {}}
 
-        categories[cat_key]["total"] += 1
-        if item.last_sorted_at is None:
-            categories[cat_key]["unsorted"] += 1
+        categories[cat_key]["total"] += total
+        categories[cat_key]["unsorted"] += unsorted
 
         # Track subcategories
-        if item.subcategory:
-            if item.subcategory not in categories[cat_key]["subcategories"]:
-                categories[cat_key]["subcategories"][item.subcategory] = {"total": 0, "unsorted": 0}
-            categories[cat_key]["subcategories"][item.subcategory]["total"] += 1
-            if item.last_sorted_at is None:
-                categories[cat_key]["subcategories"][item.subcategory]["unsorted"] += 1
+        if subcategory:
+            subcategories = categories[cat_key]["subcategories"]
+            if subcategory not in subcategories:
+                subcategories[subcategory] = {"total": 0, "unsorted": 0}
+            subcategories[subcategory]["total"] += total
+            subcategories[subcategory]["unsorted"] += unsorted
 
     result = []
     for cat, data in categories.items():
@@ -1267,16 +1700,26 @@ async def get_printable_list_with_sorting(
     """
     require_property_access(property_id, current_user)
 
-    prop = db.query(Property).filter(Property.id == property_id).first()
-    if not prop:
+    # Load the property and all its recurring items, in printable order, in one query
+    query = db.query(Property, InventoryItem).outerjoin(
+        InventoryItem,
+        and_(
+            InventoryItem.property_id == Property.id,
+            InventoryItem.is_active == True,
+            InventoryItem.is_recurring == True
+        )
+    ).filter(Property.id == property_id).order_by(
+        InventoryItem.category,
+        InventoryItem.subcategory,
+        InventoryItem.sort_order,
+        InventoryItem.name
+    )
+    rows = await asyncio.to_thread(query.all)
+    if not rows:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    # Get all recurring items
-    items = db.query(InventoryItem).filter(
-        InventoryItem.property_id == property_id,
-        InventoryItem.is_active == True,
-        InventoryItem.is_recurring == True
-    ).all()
+    prop = rows[0][0]
+    items = [item for _, item in rows if item is not None]
 
     if not items:
         return {
@@ -1300,41 +1743,39 @@ async def get_printable_list_with_sorting(
 
         now = datetime.utcnow()
 
-        # Sort each category that has unsorted items
-        for (cat, subcat), category_items in grouped_items.items():
-            needs_sorting = any(item.last_sorted_at is None for item in category_items)
-
-            if needs_sorting:
-                sorted_ids = await _sort_category_with_ai(category_items, cat, subcat if subcat else None)
-
-                for order, item_id in enumerate(sorted_ids, start=1):
-                    item = next((i for i in category_items if i.id == item_id), None)
-                    if item:
-                        item.sort_order = order
-                        item.last_sorted_at = now
-
-                categories_sorted.append({
-                    "category": cat,
-                    "subcategory": subcat or None,
-                    "items_sorted": len(sorted_ids)
-                })
+        # Sort every category that has unsorted items, batched into as few AI requests as possible
+        groups_to_sort = {
+            key: category_items for key, category_items in grouped_items.items()
+            if any(item.last_sorted_at is None for item in category_items)
+        }
+        sorted_ids_by_group = await _sort_categories_with_ai(groups_to_sort, db)
+
+        for (cat, subcat), category_items in groups_to_sort.items():
+            sorted_ids = sorted_ids_by_group[(cat, subcat)]
+
+            by_id = {i.id: i for i in category_items}
+            for order, item_id in enumerate(sorted_ids, start=1):
+                item = by_id.get(item_id)
+                if item:
+                    item.sort_order = order
+                    item.last_sorted_at = now
+
+            categories_sorted.append({
+                "category": cat,
+                "subcategory": subcat or None,
+                "items_sorted": len(sorted_ids)
+            })
 
         if categories_sorted:
-            db.commit()
-
-        # ALWAYS re-query items with proper ordering by sort_order
-        items = db.query(InventoryItem).filter(
-            InventoryItem.property_id == property_id,
-            InventoryItem.is_active == True,
-            InventoryItem.is_recurring == True
-        ).order_by(
-            InventoryItem.category,
-            InventoryItem.subcategory,
-            InventoryItem.sort_order,
-            InventoryItem.name
-        ).all()
-    else:
-        items = sorted(items, key=lambda x: (x.category or "", x.subcategory or "", x.sort_order, x.name.lower()))
+            # Re-order the loaded items by their new sort_order instead of querying again.
+            # Categories keep the position the query gave them, and the stable sort keeps
+            # the query's name order for ties.
+            group_rank = {}
+            for item in items:
+                group_rank.setdefault((item.category, item.subcategory), len(group_rank))
+            items.sort(key=lambda x: (
+                group_rank[(x.category, x.subcategory)], x.sort_order is None, x.sort_order or 0
+            ))
 
     # Build printable list
     printable_items = [
@@ -1351,7 +1792,7 @@ async def get_printable_list_with_sorting(
         for item in items
     ]
 
-    return {
+    result = {
         "property_name": prop.name,
         "property_code": prop.code,
         "generated_at": datetime.utcnow(),
@@ -1360,6 +1801,13 @@ async def get_printable_list_with_sorting(
         "total_items": len(printable_items)
     }
 
+    # Committed after the response is built, so the property and items aren't
+    # expired and reloaded
+    if categories_sorted:
+        await asyncio.to_thread(db.commit)
+
+    return result
+
 
 @router.get("/export/{property_id}")
 def export_inventory_csv(
@@ -1376,8 +1824,10 @@ def export_inventory_csv(
     if not prop:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    # Get all inventory items for this property
-    items = db.query(InventoryItem).filter(
+    # Get all inventory items for this property (with supplier for supplier_name)
+    items = _with_loads(
+        db.query(InventoryItem), joinedload(InventoryItem.supplier)
+    ).filter(
         InventoryItem.property_id == property_id
     ).order_by(InventoryItem.category, InventoryItem.name).all()
 
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, insert, or_
 from typing import List, Optional
 import csv
 import io
+from itertools import islice
 
 from app.core.database import get_db
 from app.core.security import require_admin
@@ -36,7 +37,17 @@ def list_master_products(
     db: Session = Depends(get_db)
 ):
     """List all master products (admin only)"""
-    query = db.query(MasterProduct)
+    # Supplier name and assignment count come back with each product, so the
+    # whole page is one query (the count uses the master_product_id index)
+    assignment_count = db.query(func.count(InventoryItem.id)).filter(
+        InventoryItem.master_product_id == MasterProduct.id
+    ).correlate(MasterProduct).scalar_subquery()
+
+    query = db.query(
+        MasterProduct,
+        Supplier.name.label("supplier_name"),
+        assignment_count.label("assignment_count")
+    ).outerjoin(Supplier, MasterProduct.supplier_id == Supplier.id)
 
     if not include_inactive:
         query = query.filter(MasterProduct.is_active == True)
@@ -55,23 +66,11 @@ def list_master_products(
             (MasterProduct.brand.ilike(search_term))
         )
 
-    products = query.order_by(MasterProduct.category, MasterProduct.name).offset(skip).limit(limit).all()
-
-    # Batch query: get assignment counts for all products in one query
-    product_ids = [p.id for p in products]
-    assignment_counts = {}
-    if product_ids:
-        counts = db.query(
-            InventoryItem.master_product_id,
-            func.count(InventoryItem.id)
-        ).filter(
-            InventoryItem.master_product_id.in_(product_ids)
-        ).group_by(InventoryItem.master_product_id).all()
-        assignment_counts = dict(counts)
+    rows = query.order_by(MasterProduct.category, MasterProduct.name).offset(skip).limit(limit).all()
 
     # Build response with supplier names and assignment counts
     result = []
-    for product in products:
+    for product, supplier_name, assigned_count in rows:
         product_data = MasterProductResponse(
             id=product.id,
             name=product.name,
@@ -84,7 +83,7 @@ def list_master_products(
             qty=product.qty,
             product_notes=product.product_notes,
             supplier_id=product.supplier_id,
-            supplier_name=product.supplier.name if product.supplier else None,
+            supplier_name=supplier_name,
             unit=product.unit,
             order_unit=product.order_unit,
             units_per_order_unit=product.units_per_order_unit,
@@ -92,7 +91,7 @@ def list_master_products(
             is_active=product.is_active,
             created_at=product.created_at,
             updated_at=product.updated_at,
-            assigned_property_count=assignment_counts.get(product.id, 0)
+            assigned_property_count=assigned_count
         )
         result.append(product_data)
 
@@ -151,12 +150,17 @@ def get_master_product(
     db: Session = Depends(get_db)
 ):
     """Get a single master product with assignment details"""
-    product = db.query(MasterProduct).filter(MasterProduct.id == product_id).first()
+    product = db.query(MasterProduct).options(
+        joinedload(MasterProduct.supplier)
+    ).filter(MasterProduct.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Master product not found")
 
-    # Get all inventory items linked to this master product
-    linked_items = db.query(InventoryItem).filter(
+    # Get all inventory items linked to this master product, with their
+    # properties joined in rather than loaded one item at a time
+    linked_items = db.query(InventoryItem).options(
+        joinedload(InventoryItem.camp_property)
+    ).filter(
         InventoryItem.master_product_id == product_id
     ).all()
 
@@ -317,43 +321,38 @@ def cleanup_non_recurring_master_products(
     - Deletes master products only linked to non-recurring items
     - Unlinks non-recurring items from master products that also have recurring items
     """
-    # Find all master products linked to non-recurring inventory items
-    non_recurring_items = db.query(InventoryItem).filter(
+    # Master products by whether any of their linked items are recurring / non-recurring
+    recurring_master_ids = db.query(InventoryItem.master_product_id).filter(
+        InventoryItem.master_product_id.isnot(None),
+        InventoryItem.is_recurring == True
+    )
+    non_recurring_master_ids = db.query(InventoryItem.master_product_id).filter(
         InventoryItem.master_product_id.isnot(None),
         InventoryItem.is_recurring == False
-    ).all()
-
-    unlinked_count = 0
-    deleted_master_ids = set()
-    deleted_names = []
-
-    for item in non_recurring_items:
-        master_id = item.master_product_id
-        if master_id in deleted_master_ids:
-            continue
-
-        # Check if this master product has any recurring items
-        has_recurring = db.query(InventoryItem).filter(
-            InventoryItem.master_product_id == master_id,
-            InventoryItem.is_recurring == True
-        ).first() is not None
+    )
 
-        if has_recurring:
-            # Just unlink this non-recurring item
-            item.master_product_id = None
-            unlinked_count += 1
-        else:
-            # No recurring items - delete the master product entirely
-            master = db.query(MasterProduct).filter(MasterProduct.id == master_id).first()
-            if master:
-                deleted_names.append(master.name)
-                # First unlink all items from this master
-                db.query(InventoryItem).filter(
-                    InventoryItem.master_product_id == master_id
-                ).update({"master_product_id": None})
-                # Then delete the master product
-                db.delete(master)
-                deleted_master_ids.add(master_id)
+    # Master products linked only to non-recurring items get deleted
+    orphans = db.query(MasterProduct.id, MasterProduct.name).filter(
+        MasterProduct.id.in_(non_recurring_master_ids),
+        MasterProduct.id.notin_(recurring_master_ids)
+    ).order_by(MasterProduct.id).all()
+    deleted_master_ids = [master_id for master_id, _ in orphans]
+    deleted_names = [name for _, name in orphans]
+
+    # Non-recurring items of master products that also have recurring items are just unlinked
+    unlinked_count = db.query(InventoryItem).filter(
+        InventoryItem.is_recurring == False,
+        InventoryItem.master_product_id.in_(recurring_master_ids)
+    ).update({"master_product_id": None}, synchronize_session=False)
+
+    if deleted_master_ids:
+        # First unlink all items from these masters, then delete them
+        db.query(InventoryItem).filter(
+            InventoryItem.master_product_id.in_(deleted_master_ids)
+        ).update({"master_product_id": None}, synchronize_session=False)
+        db.query(MasterProduct).filter(
+            MasterProduct.id.in_(deleted_master_ids)
+        ).delete(synchronize_session=False)
 
     db.commit()
 
@@ -433,12 +432,12 @@ def delete_master_product(
     if not product:
         raise HTTPException(status_code=404, detail="Master product not found")
 
-    # Check if any inventory items are linked
-    linked_count = db.query(InventoryItem).filter(
-        InventoryItem.master_product_id == product_id
-    ).count()
+    # Check if any inventory items are linked (EXISTS stops at the first match)
+    has_links = db.query(
+        db.query(InventoryItem).filter(InventoryItem.master_product_id == product_id).exists()
+    ).scalar()
 
-    if linked_count > 0:
+    if has_links:
         # Soft delete - mark as inactive
         product.is_active = False
         db.commit()
@@ -462,54 +461,75 @@ def assign_to_properties(
     if not product:
         raise HTTPException(status_code=404, detail="Master product not found")
 
-    created = []
+    # Look up the requested properties and any existing assignments with one query each
+    property_names = dict(
+        db.query(Property.id, Property.name).filter(Property.id.in_(request.property_ids))
+    )
+    assigned_item_ids = dict(
+        db.query(InventoryItem.property_id, InventoryItem.id).filter(
+            InventoryItem.master_product_id == product_id,
+            InventoryItem.property_id.in_(property_names)
+        )
+    )
+
+    new_rows = []
     skipped = []
+    # Skips for properties listed twice in the request, filled in once their item exists
+    repeated = []
 
     for property_id in request.property_ids:
         # Check property exists
-        prop = db.query(Property).filter(Property.id == property_id).first()
-        if not prop:
+        if property_id not in property_names:
             skipped.append({"property_id": property_id, "reason": "Property not found"})
             continue
 
         # Check if already assigned
-        existing = db.query(InventoryItem).filter(
-            InventoryItem.property_id == property_id,
-            InventoryItem.master_product_id == product_id
-        ).first()
-
-        if existing:
-            skipped.append({"property_id": property_id, "reason": "Already assigned", "inventory_item_id": existing.id})
+        if property_id in assigned_item_ids:
+            skip = {"property_id": property_id, "reason": "Already assigned", "inventory_item_id": assigned_item_ids[property_id]}
+            skipped.append(skip)
+            if skip["inventory_item_id"] is None:
+                repeated.append(skip)
             continue
+        assigned_item_ids[property_id] = None
 
-        # Create new inventory item linked to master
-        inventory_item = InventoryItem(
-            property_id=property_id,
-            master_product_id=product_id,
-            name=product.name,
-            description=product.description,
-            category=product.category,
-            subcategory=product.subcategory,
-            brand=product.brand,
-            qty=product.qty,
-            product_notes=product.product_notes,
-            supplier_id=product.supplier_id,
-            unit=product.unit,
-            order_unit=product.order_unit,
-            units_per_order_unit=product.units_per_order_unit,
-            unit_price=product.unit_price,
-            current_stock=0,
-            is_recurring=True,
-            is_active=True
-        )
-        db.add(inventory_item)
-        db.flush()
-        created.append({
+        # Row for the new inventory item linked to master
+        new_rows.append({
             "property_id": property_id,
-            "property_name": prop.name,
-            "inventory_item_id": inventory_item.id
+            "master_product_id": product_id,
+            "name": product.name,
+            "description": product.description,
+            "category": product.category,
+            "subcategory": product.subcategory,
+            "brand": product.brand,
+            "qty": product.qty,
+            "product_notes": product.product_notes,
+            "supplier_id": product.supplier_id,
+            "unit": product.unit,
+            "order_unit": product.order_unit,
+            "units_per_order_unit": product.units_per_order_unit,
+            "unit_price": product.unit_price,
+            "current_stock": 0,
+            "is_recurring": True,
+            "is_active": True
         })
 
+    created = []
+    if new_rows:
+        # All new items in one multi-row INSERT, returning their ids in request order
+        new_ids = db.execute(
+            insert(InventoryItem).returning(InventoryItem.id, sort_by_parameter_order=True),
+            new_rows
+        ).scalars().all()
+        for row, item_id in zip(new_rows, new_ids):
+            assigned_item_ids[row["property_id"]] = item_id
+            created.append({
+                "property_id": row["property_id"],
+                "property_name": property_names[row["property_id"]],
+                "inventory_item_id": item_id
+            })
+        for skip in repeated:
+            skip["inventory_item_id"] = assigned_item_ids[skip["property_id"]]
+
     db.commit()
 
     return {
@@ -563,8 +583,15 @@ def sync_items_from_master(
     synced = []
     errors = []
 
+    # Load every requested item with its master product in one query
+    items_by_id = {
+        item.id: item for item in db.query(InventoryItem).options(
+            joinedload(InventoryItem.master_product)
+        ).filter(InventoryItem.id.in_(request.inventory_item_ids))
+    }
+
     for item_id in request.inventory_item_ids:
-        item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
+        item = items_by_id.get(item_id)
         if not item:
             errors.append({"item_id": item_id, "error": "Item not found"})
             continue
@@ -664,27 +691,43 @@ def seed_from_property(
 
     items = query.all()
 
-    created = []
+    # Existing master products matching the items' names (case-insensitive), loaded at once
+    masters_by_name = {}
+    names = {item.name.lower() for item in items}
+    if names:
+        for master in db.query(MasterProduct).filter(
+            func.lower(MasterProduct.name).in_(names)
+        ).order_by(MasterProduct.id):
+            masters_by_name.setdefault(master.name.lower(), master)
+
+    # Of those, the ones this property already has an item linked to
+    linked_ids = set()
+    if masters_by_name:
+        linked_ids = {
+            master_id for (master_id,) in db.query(InventoryItem.master_product_id).filter(
+                InventoryItem.property_id == request.property_id,
+                InventoryItem.master_product_id.in_([m.id for m in masters_by_name.values()])
+            )
+        }
+    linked_masters = {m for m in masters_by_name.values() if m.id in linked_ids}
+
+    new_masters = []  # (item, master) pairs, given ids by one flush below
     linked = []
 
     for item in items:
         # Check if a similar master product already exists (by name)
-        existing_master = db.query(MasterProduct).filter(
-            MasterProduct.name.ilike(item.name)
-        ).first()
+        existing_master = masters_by_name.get(item.name.lower())
 
         if existing_master:
             # Check if this property already has an item linked to this master product
-            already_linked = db.query(InventoryItem).filter(
-                InventoryItem.property_id == request.property_id,
-                InventoryItem.master_product_id == existing_master.id
-            ).first()
-            if already_linked:
+            # (including items linked earlier in this run)
+            if existing_master in linked_masters:
                 # Skip - would create a duplicate assignment
                 continue
 
             # Link to existing master product
             item.master_product_id = existing_master.id
+            linked_masters.add(existing_master)
             linked.append({
                 "item_id": item.id,
                 "item_name": item.name,
@@ -692,7 +735,7 @@ def seed_from_property(
                 "action": "linked"
             })
         else:
-            # Create new master product
+            # Create new master product, linked to the original item
             master = MasterProduct(
                 name=item.name,
                 category=item.category,
@@ -708,17 +751,22 @@ def seed_from_property(
                 is_active=True
             )
             db.add(master)
-            db.flush()
-
-            # Link the original item to the new master
-            item.master_product_id = master.id
-
-            created.append({
-                "item_id": item.id,
-                "item_name": item.name,
-                "master_product_id": master.id,
-                "action": "created"
-            })
+            item.master_product = master
+            masters_by_name[item.name.lower()] = master
+            linked_masters.add(master)
+            new_masters.append((item, master))
+
+    # Insert all new master products together and link their items
+    db.flush()
+    created = [
+        {
+            "item_id": item.id,
+            "item_name": item.name,
+            "master_product_id": master.id,
+            "action": "created"
+        }
+        for item, master in new_masters
+    ]
 
     db.commit()
 
@@ -731,8 +779,22 @@ def seed_from_property(
     }
 
 
+# Rows parsed and matched per batch; bounds the size of the lookup query's IN lists
+CSV_CHUNK_SIZE = 5000
+
+
+def _csv_float(value: Optional[str], default: Optional[float] = None) -> Optional[float]:
+    """Parse a stripped CSV cell as a float; blank or invalid cells give `default`"""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
 @router.post("/upload-csv", response_model=CSVUploadResponse)
-async def upload_master_products_csv(
+def upload_master_products_csv(
     file: UploadFile = File(...),
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -741,9 +803,10 @@ async def upload_master_products_csv(
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
 
-    content = await file.read()
-    decoded = content.decode('utf-8')
-    reader = csv.DictReader(io.StringIO(decoded))
+    # A plain def, so FastAPI runs the parsing and database work in its threadpool
+    # instead of blocking the event loop. The upload is decoded and parsed as it
+    # is read rather than loaded into memory whole.
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding='utf-8', newline=''))
 
     created_count = 0
     updated_count = 0
@@ -752,85 +815,89 @@ async def upload_master_products_csv(
     # Get supplier lookup
     suppliers = {s.name.lower(): s.id for s in db.query(Supplier).all()}
 
-    for row_num, row in enumerate(reader, start=2):
-        try:
-            name = row.get('name', '').strip()
-            if not name:
-                errors.append(f"Row {row_num}: Name is required")
-                continue
-
-            # Look up supplier by name
-            supplier_name = row.get('supplier_name', '').strip().lower()
-            supplier_id = suppliers.get(supplier_name) if supplier_name else None
-
-            # Check if exists by SKU or name
-            sku = row.get('sku', '').strip() or None
-            existing = None
-            if sku:
-                existing = db.query(MasterProduct).filter(MasterProduct.sku == sku).first()
-            if not existing:
-                existing = db.query(MasterProduct).filter(
-                    MasterProduct.name.ilike(name)
-                ).first()
-
-            if existing:
-                # Update existing
-                existing.name = name
-                existing.sku = sku
-                existing.category = row.get('category', '').strip() or existing.category
-                existing.subcategory = row.get('subcategory', '').strip() or existing.subcategory
-                existing.description = row.get('description', '').strip() or existing.description
-                existing.brand = row.get('brand', '').strip() or existing.brand
-                existing.product_notes = row.get('product_notes', '').strip() or existing.product_notes
-                existing.supplier_id = supplier_id or existing.supplier_id
-                existing.unit = row.get('unit', '').strip() or existing.unit
-                existing.order_unit = row.get('order_unit', '').strip() or existing.order_unit
-
-                try:
-                    existing.units_per_order_unit = float(row.get('units_per_order_unit', '')) if row.get('units_per_order_unit', '').strip() else existing.units_per_order_unit
-                except ValueError:
-                    pass
-
-                try:
-                    existing.unit_price = float(row.get('unit_price', '')) if row.get('unit_price', '').strip() else existing.unit_price
-                except ValueError:
-                    pass
-
-                updated_count += 1
-            else:
-                # Create new
-                unit_price = None
-                try:
-                    unit_price = float(row.get('unit_price', '')) if row.get('unit_price', '').strip() else None
-                except ValueError:
-                    pass
-
-                units_per_order = None
-                try:
-                    units_per_order = float(row.get('units_per_order_unit', '')) if row.get('units_per_order_unit', '').strip() else None
-                except ValueError:
-                    pass
-
-                product = MasterProduct(
-                    name=name,
-                    sku=sku,
-                    category=row.get('category', '').strip() or None,
-                    subcategory=row.get('subcategory', '').strip() or None,
-                    description=row.get('description', '').strip() or None,
-                    brand=row.get('brand', '').strip() or None,
-                    product_notes=row.get('product_notes', '').strip() or None,
-                    supplier_id=supplier_id,
-                    unit=row.get('unit', '').strip() or 'unit',
-                    order_unit=row.get('order_unit', '').strip() or None,
-                    units_per_order_unit=units_per_order,
-                    unit_price=unit_price,
-                    is_active=True
-                )
-                db.add(product)
-                created_count += 1
-
-        except Exception as e:
-            errors.append(f"Row {row_num}: {str(e)}")
+    row_num = 1  # The header is row 1
+    while True:
+        # Strip every cell once up front; missing cells become ""
+        rows = [
+            {key: (value or '').strip() for key, value in row.items() if key is not None}
+            for row in islice(reader, CSV_CHUNK_SIZE)
+        ]
+        if not rows:
+            break
+
+        # Load every existing product matching a row of this chunk by SKU or name
+        # (case-insensitive) with one query, instead of up to two lookups per row.
+        # As before (the session doesn't autoflush), rows are matched against the
+        # products already saved.
+        skus = {row.get('sku', '') for row in rows} - {''}
+        names = {row.get('name', '').lower() for row in rows} - {''}
+        by_sku = {}
+        by_name = {}
+        if skus or names:
+            for product in db.query(MasterProduct).filter(
+                or_(MasterProduct.sku.in_(skus), func.lower(MasterProduct.name).in_(names))
+            ).order_by(MasterProduct.id):
+                if product.sku:
+                    by_sku.setdefault(product.sku, product)
+                by_name.setdefault(product.name.lower(), product)
+
+        for row_num, row in enumerate(rows, start=row_num + 1):
+            try:
+                name = row.get('name', '')
+                if not name:
+                    errors.append(f"Row {row_num}: Name is required")
+                    continue
+
+                # Look up supplier by name
+                supplier_name = row.get('supplier_name', '').lower()
+                supplier_id = suppliers.get(supplier_name) if supplier_name else None
+
+                # Check if exists by SKU or name
+                sku = row.get('sku') or None
+                existing = None
+                if sku:
+                    existing = by_sku.get(sku)
+                if not existing:
+                    existing = by_name.get(name.lower())
+
+                if existing:
+                    # Update existing; blank or invalid cells keep the current value
+                    existing.name = name
+                    existing.sku = sku
+                    existing.category = row.get('category') or existing.category
+                    existing.subcategory = row.get('subcategory') or existing.subcategory
+                    existing.description = row.get('description') or existing.description
+                    existing.brand = row.get('brand') or existing.brand
+                    existing.product_notes = row.get('product_notes') or existing.product_notes
+                    existing.supplier_id = supplier_id or existing.supplier_id
+                    existing.unit = row.get('unit') or existing.unit
+                    existing.order_unit = row.get('order_unit') or existing.order_unit
+                    existing.units_per_order_unit = _csv_float(row.get('units_per_order_unit'), existing.units_per_order_unit)
+                    existing.unit_price = _csv_float(row.get('unit_price'), existing.unit_price)
+
+                    updated_count += 1
+                else:
+                    # Create new
+                    product = MasterProduct(
+                        name=name,
+                        sku=sku,
+                        category=row.get('category') or None,
+                        subcategory=row.get('subcategory') or None,
+                        description=row.get('description') or None,
+                        brand=row.get('brand') or None,
+                        product_notes=row.get('product_notes') or None,
+                        supplier_id=supplier_id,
+                        unit=row.get('unit') or 'unit',
+                        order_unit=row.get('order_unit') or None,
+                        units_per_order_unit=_csv_float(row.get('units_per_order_unit')),
+                        unit_price=_csv_float(row.get('unit_price')),
+                        is_active=True
+                    )
+                    db.add(product)
+                    created_count += 1
+
+            except Exception as e:
+                errors.append(f"Row {row_num}: {str(e)}")
 
     db.commit()
 
@@ -8,6 +8,7 @@ import logging
 import os
 import uuid
 import io
+import orjson
 
 from app.core.database import get_db
 from app.core.config import settings
@@ -316,7 +317,7 @@ Return the data as JSON with the price_verified field for each item."""
 
         # Parse the response
         result_text = response.choices[0].message.content
-        result_data = json.loads(result_text)
+        result_data = orjson.loads(result_text)
 
         # Parse date if present
         receipt_date = None
@@ -554,7 +555,7 @@ Examples: Costco, Walmart, Sysco, US Foods, Restaurant Depot, Charlie's Produce"
                 response_format={"type": "json_object"}
             )
 
-        result = json.loads(response.choices[0].message.content)
+        result = orjson.loads(response.choices[0].message.content)
         return result.get("supplier_name")
     except Exception as e:
         logger.warning(f"Could not detect supplier from image: {e}")
@@ -16,9 +16,13 @@ class Settings(BaseSettings):
 
     # Environment
     ENVIRONMENT: str = "development"
+    # Development-only checks and debug output; leave off in production
+    DEBUG: bool = False
 
     # OpenAI API Key (for AI vision and receipt OCR)
     OPENAI_API_KEY: Optional[str] = None
+    # Request budget for the API key; bursts beyond it wait instead of getting 429s
+    OPENAI_REQUESTS_PER_MINUTE: int = 500
 
     # Email Settings (Gmail SMTP)
     SMTP_HOST: str = "smtp.gmail.com"
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from io import StringIO
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+
+# Fail fast if api.openai.com can't be reached; completions themselves can take minutes
+OPENAI_CONNECT_TIMEOUT = 10.0
+
+
+def openai_timeout(seconds: float) -> httpx.Timeout:
+    """Per-request timeout for an OpenAI call, keeping the short connect timeout"""
+    return httpx.Timeout(seconds, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows bursts of up to `capacity` acquisitions, refilling
+    at `rate` tokens per second. Callers that find it empty wait their turn.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # Holding the lock while sleeping makes waiters proceed in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+# Shared by every OpenAI request in this process (one API key)
+openai_rate_limiter = TokenBucket(
+    capacity=settings.OPENAI_REQUESTS_PER_MINUTE,
+    rate=settings.OPENAI_REQUESTS_PER_MINUTE / 60
+)
+
+_openai_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_openai_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared HTTP client for OpenAI API calls.
+
+    A single pooled HTTP/2 client is reused across requests so calls skip the
+    TCP/TLS handshake, and concurrent page requests multiplex over one connection.
+    The auth and content-type headers are set on the client.
+    Created at startup (or on first use); closed by close_openai_http_client() on shutdown.
+    """
+    global _openai_http_client
+    if _openai_http_client is None or _openai_http_client.is_closed:
+        _openai_http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=openai_timeout(180.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            headers={
+                "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+                "Content-Type": "application/json"
+            }
+        )
+    return _openai_http_client
+
+
+async def close_openai_http_client() -> None:
+    """Close the shared OpenAI HTTP client, if it was created"""
+    global _openai_http_client
+    if _openai_http_client is not None:
+        await _openai_http_client.aclose()
+        _openai_http_client = None
+        logger.info("OpenAI HTTP client closed")
+
+
+class OpenAIAPIError(Exception):
+    """Raised when the OpenAI API answers a request with a non-200 status"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"OpenAI API error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def iter_chat_completion(body: Dict[str, Any], timeout: float) -> AsyncIterator[str]:
+    """
+    Run a chat completion with stream=True and yield the assistant message text
+    (`delta.content` of each server-sent event) as it arrives.
+    Close the generator (e.g. with contextlib.aclosing) to stop reading early.
+    Waits for the OpenAI rate limiter before sending.
+    Raises OpenAIAPIError on a non-200 response.
+    """
+    await openai_rate_limiter.acquire()
+    client = get_openai_http_client()
+    async with client.stream(
+        "POST",
+        OPENAI_CHAT_COMPLETIONS_URL,
+        content=orjson.dumps({**body, "stream": True}),
+        timeout=openai_timeout(timeout)
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            try:
+                detail = response.json() if response.content else "Unknown error"
+            except ValueError:
+                detail = response.text
+            raise OpenAIAPIError(response.status_code, detail)
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+
+            choices = orjson.loads(data).get("choices")
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                yield delta
+
+
+async def stream_chat_completion(body: Dict[str, Any], timeout: float) -> str:
+    """
+    Run a streamed chat completion and return the full assistant message text.
+
+    Parsing can start as soon as the model finishes instead of after the whole
+    body has been buffered.
+    Raises OpenAIAPIError on a non-200 response.
+    """
+    content = StringIO()
+    async with aclosing(iter_chat_completion(body, timeout)) as deltas:
+        async for delta in deltas:
+            content.write(delta)
+    return content.getvalue()
@@ -0,0 +1,36 @@
+import base64
+import binascii
+from typing import Any, List, Tuple
+
+import orjson
+from fastapi import HTTPException
+
+# Response header carrying the cursor for the next page of a keyset-paginated list
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort-key values of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode("ascii")
+
+
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor().
+    `types` are the JSON types of the sort-key values, in order. Raises a 400 if
+    the cursor is malformed or its values don't match them, so a tampered cursor
+    never reaches the keyset comparison.
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Exact type checks: bool is a subclass of int but never a valid sort key
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or any(type(value) is not expected for value, expected in zip(values, types))
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
@@ -4,6 +4,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import true, false
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.core.database import get_db
@@ -145,6 +146,17 @@ def check_property_access(user: User, property_id: int) -> bool:
     return False
 
 
+def property_access_clause(user: User, property_id_column):
+    """SQL filter matching rows whose property the user can access (see check_property_access)"""
+    if user.role == UserRole.ADMIN.value:
+        return true()
+    if user.role in [UserRole.PURCHASING_SUPERVISOR.value, UserRole.PURCHASING_TEAM.value]:
+        return true()
+    if user.role == UserRole.CAMP_WORKER.value:
+        return property_id_column == user.property_id
+    return false()
+
+
 def require_property_access(property_id: int, user: User) -> None:
     """Raise exception if user doesn't have property access"""
     if not check_property_access(user, property_id):
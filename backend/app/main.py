@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -21,6 +21,7 @@ logger = logging.getLogger("sukakpak")
 
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.http_client import get_openai_http_client, close_openai_http_client
 from app.api.router import api_router
 
 # Create database tables
@@ -153,9 +154,45 @@ def add_missing_columns():
         except Exception as e:
             print(f"Note: Could not check/add order_at column: {e}")
 
+# Add missing indexes to existing tables (create_all only indexes new tables)
+def add_missing_indexes():
+    """Create indexes declared on the models if they don't exist yet"""
+    indexes = [
+        ("ix_inventory_items_property_active_category", "inventory_items", "property_id, is_active, category"),
+        ("ix_suppliers_is_active", "suppliers", "is_active"),
+        ("ix_inventory_counts_property_date_id", "inventory_counts", "property_id, count_date, id"),
+        ("ix_inventory_items_listing", "inventory_items",
+         "property_id, is_active, COALESCE(sort_order, 0), COALESCE(category, ''), name, id"),
+        ("ix_inventory_items_printable", "inventory_items",
+         "property_id, is_active, is_recurring, category, sort_order, name"),
+        ("ix_inventory_items_active_name_lower", "inventory_items",
+         "property_id, is_active, lower(trim(name))"),
+        ("ix_inventory_items_printable_subcategory", "inventory_items",
+         "property_id, is_active, is_recurring, category, subcategory, sort_order, name"),
+        ("ix_master_products_name_lower", "master_products", "lower(name)"),
+    ]
+    # Indexes superseded by a wider index above
+    replaced_indexes = [
+        "ix_inventory_items_property_active",
+    ]
+    with engine.connect() as conn:
+        for index_name in replaced_indexes:
+            try:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+                conn.commit()
+            except Exception as e:
+                print(f"Note: Could not drop index {index_name}: {e}")
+        for index_name, table_name, columns in indexes:
+            try:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+                conn.commit()
+            except Exception as e:
+                print(f"Note: Could not create index {index_name}: {e}")
+
 logger.info("Running column migrations...")
 try:
     add_missing_columns()
+    add_missing_indexes()
     logger.info("Column migrations completed successfully")
 except Exception as e:
     logger.warning(f"Could not run column migrations: {e}")
@@ -170,7 +207,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse,
 )
 
 # Add rate limiter
@@ -196,6 +234,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset-paginated lists return the next page's cursor in a header
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Global exception handler to ensure errors always return proper JSON responses
@@ -212,6 +252,8 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Startup/shutdown events
 @app.on_event("startup")
 async def startup_event():
+    # Create the shared OpenAI client up front rather than on the first AI request
+    get_openai_http_client()
     logger.info("FastAPI application startup complete - ready to serve requests")
     logger.info(f"CORS allowed origins: {allowed_origins}")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
@@ -219,6 +261,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("FastAPI application shutting down")
+    await close_openai_http_client()
 
 # Include API routes
 app.include_router(api_router)
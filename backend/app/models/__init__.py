@@ -2,7 +2,7 @@ from app.models.user import User, UserRole
 from app.models.property import Property
 from app.models.supplier import Supplier
 from app.models.master_product import MasterProduct, ProductCategory
-from app.models.inventory import InventoryItem, InventoryCount, InventoryCountItem, UnitType, ReceiptCodeAlias
+from app.models.inventory import InventoryItem, InventoryCount, InventoryCountItem, UnitType, ReceiptCodeAlias, AISortCache
 from app.models.order import Order, OrderItem, OrderStatus, OrderItemFlag
 from app.models.receipt import Receipt
 from app.models.notification import Notification, NotificationType
@@ -19,6 +19,7 @@ __all__ = [
     "InventoryCountItem",
     "UnitType",
     "ReceiptCodeAlias",
+    "AISortCache",
     "Order",
     "OrderItem",
     "OrderStatus",
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean, Index, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_method
 from app.core.database import Base
+from typing import Optional
 import enum
 
 
@@ -22,12 +24,72 @@ class UnitType(str, enum.Enum):
     OTHER = "other"
 
 
+def calculate_suggested_order_qty(
+    current_stock: Optional[float],
+    par_level: Optional[float],
+    order_at: Optional[float],
+    avg_weekly_usage: Optional[float],
+    units_per_order_unit: Optional[float]
+) -> float:
+    """
+    Suggest order quantity in ORDER UNITS based on usage and par level.
+    Only suggests ordering when stock is at or below order_at threshold.
+    Orders enough to bring stock back up to par_level.
+    Returns quantity in order units (e.g., cases), rounded up to whole units.
+    """
+    # Determine the trigger threshold (order_at, falling back to par_level)
+    threshold = order_at if order_at is not None else par_level
+
+    # Only suggest ordering if we're at or below the threshold
+    if threshold is None:
+        return 0
+    if (current_stock or 0) > threshold:
+        return 0
+
+    # Calculate needed quantity in inventory units (target is par_level)
+    if avg_weekly_usage and par_level:
+        needed_inventory_units = par_level - (current_stock or 0) + avg_weekly_usage
+    elif par_level:
+        needed_inventory_units = par_level - (current_stock or 0)
+    else:
+        return 0
+
+    needed_inventory_units = max(0, needed_inventory_units)
+
+    if needed_inventory_units == 0:
+        return 0
+
+    # Convert to order units if conversion is set
+    units_per_order = units_per_order_unit or 1.0
+    if units_per_order > 0:
+        import math
+        order_qty = math.ceil(needed_inventory_units / units_per_order)
+        return order_qty
+
+    return needed_inventory_units
+
+
 class InventoryItem(Base):
     """
     Property-specific inventory item.
     Each property has its own inventory list with items, suppliers, and par levels.
     """
     __tablename__ = "inventory_items"
+    __table_args__ = (
+        # Most inventory lookups filter on a property's active items; category
+        # is included so the distinct category list can be read from the index
+        Index("ix_inventory_items_property_active_category", "property_id", "is_active", "category"),
+        # Matches the printable list's filter and ORDER BY category, sort_order, name
+        Index(
+            "ix_inventory_items_printable", "property_id", "is_active", "is_recurring",
+            "category", "sort_order", "name"
+        ),
+        # Matches the AI-sorted printable list's ORDER BY category, subcategory, sort_order, name
+        Index(
+            "ix_inventory_items_printable_subcategory", "property_id", "is_active", "is_recurring",
+            "category", "subcategory", "sort_order", "name"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     property_id = Column(Integer, ForeignKey("properties.id"), nullable=False, index=True)
@@ -95,6 +157,7 @@ class InventoryItem(Base):
     order_items = relationship("OrderItem", back_populates="inventory_item")
     receipt_aliases = relationship("ReceiptCodeAlias", back_populates="inventory_item", cascade="all, delete-orphan")
 
+    @hybrid_method
     def is_low_stock(self) -> bool:
         """Check if item is at or below order-at threshold"""
         threshold = self.order_at if self.order_at is not None else self.par_level
@@ -102,43 +165,18 @@ class InventoryItem(Base):
             return False
         return (self.current_stock or 0) <= threshold
 
-    def suggested_order_qty(self) -> float:
-        """
-        Suggest order quantity in ORDER UNITS based on usage and par level.
-        Only suggests ordering when stock is at or below order_at threshold.
-        Orders enough to bring stock back up to par_level.
-        Returns quantity in order units (e.g., cases), rounded up to whole units.
-        """
-        # Determine the trigger threshold (order_at, falling back to par_level)
-        threshold = self.order_at if self.order_at is not None else self.par_level
-
-        # Only suggest ordering if we're at or below the threshold
-        if threshold is None:
-            return 0
-        if (self.current_stock or 0) > threshold:
-            return 0
-
-        # Calculate needed quantity in inventory units (target is par_level)
-        if self.avg_weekly_usage and self.par_level:
-            needed_inventory_units = self.par_level - (self.current_stock or 0) + self.avg_weekly_usage
-        elif self.par_level:
-            needed_inventory_units = self.par_level - (self.current_stock or 0)
-        else:
-            return 0
-
-        needed_inventory_units = max(0, needed_inventory_units)
-
-        if needed_inventory_units == 0:
-            return 0
-
-        # Convert to order units if conversion is set
-        units_per_order = self.units_per_order_unit or 1.0
-        if units_per_order > 0:
-            import math
-            order_qty = math.ceil(needed_inventory_units / units_per_order)
-            return order_qty
+    @is_low_stock.expression
+    def is_low_stock(cls):
+        """SQL form of is_low_stock(); a NULL threshold compares as not low"""
+        threshold = func.coalesce(cls.order_at, cls.par_level)
+        return func.coalesce(cls.current_stock, 0) <= threshold
 
-        return needed_inventory_units
+    def suggested_order_qty(self) -> float:
+        """Suggest order quantity in ORDER UNITS (see calculate_suggested_order_qty)"""
+        return calculate_suggested_order_qty(
+            self.current_stock, self.par_level, self.order_at,
+            self.avg_weekly_usage, self.units_per_order_unit
+        )
 
     def get_effective_order_unit(self) -> str:
         """Get the unit used for ordering (falls back to inventory unit if not set)"""
@@ -149,12 +187,38 @@ class InventoryItem(Base):
         return self.units_per_order_unit or 1.0
 
 
+# Matches list_inventory_items' sort keys (NULLs coalesced for keyset pagination)
+# so a property's items can be read in index order without a sort step
+Index(
+    "ix_inventory_items_listing",
+    InventoryItem.property_id,
+    InventoryItem.is_active,
+    func.coalesce(InventoryItem.sort_order, 0),
+    func.coalesce(InventoryItem.category, ""),
+    InventoryItem.name,
+    InventoryItem.id,
+)
+
+# Normalized names of a property's active items, for the seed duplicate check
+Index(
+    "ix_inventory_items_active_name_lower",
+    InventoryItem.property_id,
+    InventoryItem.is_active,
+    func.lower(func.trim(InventoryItem.name)),
+)
+
+
 class InventoryCount(Base):
     """
     Represents an inventory count session for a property.
     Can be created manually or from AI vision analysis of a photo.
     """
     __tablename__ = "inventory_counts"
+    __table_args__ = (
+        # Backs the newest-first keyset pagination of a property's counts
+        # (a B-tree index is scanned backwards for DESC order)
+        Index("ix_inventory_counts_property_date_id", "property_id", "count_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     property_id = Column(Integer, ForeignKey("properties.id"), nullable=False, index=True)
@@ -230,3 +294,17 @@ class ReceiptCodeAlias(Base):
     # Relationships
     inventory_item = relationship("InventoryItem", back_populates="receipt_aliases")
     supplier = relationship("Supplier", back_populates="receipt_aliases")
+
+
+class AISortCache(Base):
+    """
+    AI-chosen item order for a category, keyed by the SHA-256 of its sorted item names.
+    Categories with the same contents (at any property) reuse the order instead of
+    asking OpenAI again.
+    """
+    __tablename__ = "ai_sort_cache"
+
+    key = Column(String(64), primary_key=True)
+    # Casefolded item names in sorted order
+    ordered_names = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -58,6 +58,10 @@ class MasterProduct(Base):
         return f"<MasterProduct(id={self.id}, name='{self.name}')>"
 
 
+# Case-insensitive name lookups when matching items or CSV rows to master products
+Index("ix_master_products_name_lower", func.lower(MasterProduct.name))
+
+
 class ProductCategory(Base):
     """
     Custom product categories and subcategories.
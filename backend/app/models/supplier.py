@@ -17,7 +17,7 @@ class Supplier(Base):
     website = Column(String(255), nullable=True)
     account_number = Column(String(100), nullable=True)
     notes = Column(Text, nullable=True)
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, index=True)
 
     # Supplier-specific receipt parsing instructions
     # Custom prompt to help AI understand this supplier's receipt format
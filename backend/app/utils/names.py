@@ -0,0 +1,47 @@
+from typing import Iterable, Set
+
+# Joins names into one searchable string; can't appear in an item name
+_NAME_SEPARATOR = "\x00"
+
+
+class NameMatchIndex:
+    """
+    Casefolded item names, indexed for the seed-from-photo duplicate check.
+
+    A name matches if it equals an indexed name, is contained in one, or
+    contains one. Instead of a substring test against every indexed name,
+    "contained in" is a single scan of all names joined into one string, and
+    "contains" looks up each slice of the candidate whose length matches an
+    indexed name's length in a set.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: Set[str] = set()
+        self._lengths: Set[int] = set()
+        self._joined = _NAME_SEPARATOR
+        for name in names:
+            self.add(name)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return name.casefold().strip()
+
+    def add(self, name: str) -> None:
+        key = self._key(name)
+        if not key or key in self._names:
+            return
+        self._names.add(key)
+        self._lengths.add(len(key))
+        self._joined += key + _NAME_SEPARATOR
+
+    def matches(self, name: str) -> bool:
+        key = self._key(name)
+        if not key:
+            return False
+        if key in self._names or key in self._joined:
+            return True
+        return any(
+            key[start:start + length] in self._names
+            for length in self._lengths if length < len(key)
+            for start in range(len(key) - length + 1)
+        )
@@ -0,0 +1,13 @@
+# Long-side pixel size PDF pages are rasterized to for OCR / Vision
+PDF_RENDER_TARGET_PX = 1600
+PDF_RENDER_MAX_SCALE = 2.0
+
+
+def pdf_render_scale(page) -> float:
+    """
+    Pick a rasterization scale for a PyMuPDF page so its long side comes out
+    near PDF_RENDER_TARGET_PX: small pages are upscaled (at most 2x), pages
+    already that large are rendered at their native size.
+    """
+    long_side = max(page.rect.width, page.rect.height)
+    return min(PDF_RENDER_MAX_SCALE, max(1.0, PDF_RENDER_TARGET_PX / long_side))
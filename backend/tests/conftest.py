@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
+from app.core.config import settings
 from app.core.database import Base, get_db
 from app.core.security import get_password_hash
 from app.models.user import User, UserRole
@@ -47,6 +48,13 @@ def mock_emails():
         yield
 
 
+@pytest.fixture(scope="function", autouse=True)
+def debug_settings():
+    """Run tests with DEBUG on, so unplanned lazy loads raise (see _with_loads)."""
+    with patch.object(settings, "DEBUG", True):
+        yield
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a test client with database override."""
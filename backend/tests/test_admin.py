@@ -0,0 +1,268 @@
+import base64
+import json
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+
+from app.core.config import Settings, settings
+
+from app.models.inventory import InventoryItem
+from app.models.order import Order, OrderItem, OrderStatus
+from app.api.endpoints.admin import build_inventory_match_index, find_match, extract_text_from_pdf, convert_pdf_to_images
+
+# Fixtures (test_property, test_supplier, test_inventory_item, admin_user,
+# admin_headers) are defined in conftest.py.
+
+
+# ============== NAME MATCHING TESTS ==============
+
+def test_find_match_exact_normalized_name():
+    """Test that a normalized exact match returns a perfect score."""
+    items = [InventoryItem(name="Green Onions"), InventoryItem(name="Black Beans")]
+    norm_map, token_index, indexed_items = build_inventory_match_index(items)
+
+    match, score = find_match("green  onions", norm_map, token_index, indexed_items)
+
+    assert match is items[0]
+    assert score == 1.0
+
+
+def test_find_match_inverted_name():
+    """Test that inverted names like 'Beans, black' match 'Black Beans'."""
+    items = [InventoryItem(name="Green Onions"), InventoryItem(name="Black Beans")]
+    norm_map, token_index, indexed_items = build_inventory_match_index(items)
+
+    match, score = find_match("Beans, black", norm_map, token_index, indexed_items)
+
+    assert match is items[1]
+    assert score >= 0.6
+
+
+def test_find_match_no_shared_tokens():
+    """Test that names without a shared token do not match."""
+    items = [InventoryItem(name="Paper Towels")]
+    norm_map, token_index, indexed_items = build_inventory_match_index(items)
+
+    match, score = find_match("Sockeye Salmon", norm_map, token_index, indexed_items)
+
+    assert match is None
+    assert score == 0.0
+
+
+@pytest.mark.parametrize("existing_name,seeded_name", [
+    ("Green Bell Peppers", "Red Bell Peppers"),
+    ("Chicken Thighs", "Chicken Breast"),
+    ("Paper Plates", "Paper Towels"),
+    ("Whole Milk", "2% Milk"),
+])
+def test_find_match_keeps_distinct_variants_apart(existing_name, seeded_name):
+    """Test that variants sharing a token are not merged into one inventory item."""
+    items = [InventoryItem(name=existing_name)]
+    norm_map, token_index, indexed_items = build_inventory_match_index(items)
+
+    match, score = find_match(seeded_name, norm_map, token_index, indexed_items)
+
+    assert match is None
+
+
+# ============== DOCUMENT EXTRACTION TESTS ==============
+
+def _make_pdf(lines, pages=1):
+    """Build an in-memory PDF with the given text lines on each page."""
+    import fitz
+
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        for i, line in enumerate(lines):
+            page.insert_text((72, 72 + i * 14), line)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def test_extract_text_from_text_pdf():
+    """Test that a PDF with a text layer returns its text."""
+    lines = [f"{i} Case Green Onions  $12.50  US Foods" for i in range(1, 15)]
+
+    text = extract_text_from_pdf(_make_pdf(lines))
+
+    assert text is not None
+    assert "Green Onions" in text
+
+
+def test_extract_text_from_scanned_pdf_returns_none():
+    """Test that a PDF without enough text falls back to the image path."""
+    assert extract_text_from_pdf(_make_pdf([])) is None
+
+
+def test_convert_pdf_to_images_limits_pages():
+    """Test that only the first five pages are rendered, in page order."""
+    content = _make_pdf([], pages=7)
+
+    images = convert_pdf_to_images(content)
+
+    assert len(images) == 5
+    # Pages are sent as JPEG
+    assert all(base64.b64decode(img)[:3] == b"\xff\xd8\xff" for img in images)
+
+
+def test_extract_order_rejects_oversized_file(client: TestClient, admin_headers):
+    """Test that uploads over 10MB are rejected before any AI call."""
+    content = b"%PDF-1.4\n" + b"0" * (10 * 1024 * 1024)
+
+    response = client.post(
+        "/api/v1/admin/extract-order-pdf",
+        headers=admin_headers,
+        files={"file": ("order.pdf", content, "application/pdf")},
+    )
+
+    assert response.status_code == 413
+
+
+def test_extract_order_from_text_pdf(client: TestClient, admin_headers):
+    """Test that a text-based PDF is sent to the model as text and parsed."""
+    ai_result = {
+        "items": [{"item_name": "Green Onions", "quantity": 3, "unit": "Bundle", "unit_price": 1.5}],
+        "order_date": "2025-06-01",
+        "confidence_score": 0.9,
+    }
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content=json.dumps(ai_result)))]
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+    lines = [f"{i} Bundle Green Onions  $1.50  US Foods" for i in range(1, 15)]
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch.object(settings, "DEBUG", Settings.model_fields["DEBUG"].default), \
+         patch("openai.AsyncOpenAI", return_value=mock_client):
+        response = client.post(
+            "/api/v1/admin/extract-order-pdf",
+            headers=admin_headers,
+            files={"file": ("order.pdf", _make_pdf(lines), "application/pdf")},
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["items"][0]["item_name"] == "Green Onions"
+    assert data["items"][0]["quantity"] == 3
+    # DEBUG is off by default, so the raw model output isn't sent
+    assert data["raw_text"] is None
+
+    user_content = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert isinstance(user_content, str)
+    assert "Green Onions" in user_content
+
+
+def test_extract_order_returns_raw_text_in_debug(client: TestClient, admin_headers):
+    """Test that the raw model output is returned only when DEBUG is on."""
+    result_text = json.dumps({"items": [{"item_name": "Green Onions", "quantity": 3}], "confidence_score": 0.9})
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content=result_text))]
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+    lines = [f"{i} Bundle Green Onions  $1.50  US Foods" for i in range(1, 15)]
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch.object(settings, "DEBUG", True), \
+         patch("openai.AsyncOpenAI", return_value=mock_client):
+        response = client.post(
+            "/api/v1/admin/extract-order-pdf",
+            headers=admin_headers,
+            files={"file": ("order.pdf", _make_pdf(lines), "application/pdf")},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["raw_text"] == result_text
+
+
+# ============== SEED HISTORICAL ORDER TESTS ==============
+
+def test_seed_historical_order_matches_existing_item(client: TestClient, db_session, admin_headers, test_property, test_inventory_item):
+    """Test that seeded items link to an existing inventory item by name."""
+    response = client.post(
+        "/api/v1/admin/seed-historical-order",
+        headers=admin_headers,
+        json={
+            "property_id": test_property.id,
+            "order_date": "2025-06-01",
+            "status": "received",
+            "items": [
+                {"item_name": "flour", "quantity": 4, "unit_price": 2.5},
+            ],
+        },
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["item_count"] == 1
+    assert data["status"] == OrderStatus.RECEIVED.value
+    assert data["estimated_total"] == 10.0
+
+    order = db_session.query(Order).filter(Order.id == data["id"]).first()
+    assert order.actual_total == 10.0
+    assert order.items[0].inventory_item_id == test_inventory_item.id
+
+
+def test_seed_historical_order_creates_and_reuses_new_item(client: TestClient, db_session, admin_headers, test_property):
+    """Test that a new item is created once and reused by later lines in the same order."""
+    response = client.post(
+        "/api/v1/admin/seed-historical-order",
+        headers=admin_headers,
+        json={
+            "property_id": test_property.id,
+            "order_date": "2025-06-01",
+            "items": [
+                {"item_name": "Green Onions", "quantity": 2, "unit": "Bundle"},
+                {"item_name": "Onions, green", "quantity": 3},
+            ],
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json()["item_count"] == 2
+
+    created = db_session.query(InventoryItem).filter(
+        InventoryItem.property_id == test_property.id
+    ).all()
+    assert [item.name for item in created] == ["Green Onions"]
+
+    order_items = db_session.query(OrderItem).all()
+    assert {oi.inventory_item_id for oi in order_items} == {created[0].id}
+
+
+def test_seed_historical_order_matches_supplier_by_name(client: TestClient, db_session, admin_headers, test_property, test_supplier):
+    """Test that seeded lines resolve supplier names case-insensitively, including partial names."""
+    response = client.post(
+        "/api/v1/admin/seed-historical-order",
+        headers=admin_headers,
+        json={
+            "property_id": test_property.id,
+            "order_date": "2025-06-01",
+            "items": [
+                {"item_name": "Black Beans", "quantity": 1, "supplier_name": "TEST SUPPLIER"},
+                {"item_name": "Paper Towels", "quantity": 1, "supplier_name": "test"},
+                {"item_name": "Rice", "quantity": 1, "supplier_name": "Unknown Vendor"},
+            ],
+        },
+    )
+
+    assert response.status_code == 200
+
+    order_items = db_session.query(OrderItem).order_by(OrderItem.id).all()
+    assert [oi.supplier_id for oi in order_items] == [test_supplier.id, test_supplier.id, None]
+
+
+def test_seed_historical_order_requires_admin(client: TestClient, auth_headers, test_property):
+    """Test that non-admin users cannot seed historical orders."""
+    response = client.post(
+        "/api/v1/admin/seed-historical-order",
+        headers=auth_headers,
+        json={
+            "property_id": test_property.id,
+            "order_date": "2025-06-01",
+            "items": [],
+        },
+    )
+
+    assert response.status_code == 403
@@ -75,3 +75,37 @@ def test_get_current_user_unauthorized(client: TestClient):
     """Test getting current user without auth fails."""
     response = client.get("/api/v1/auth/me")
     assert response.status_code == 401
+
+
+def test_login_disabled_user(client: TestClient, db_session, test_user):
+    """Test that a user disabled after a successful login cannot log in again."""
+    credentials = {"username": "test@example.com", "password": "testpassword"}
+    assert client.post("/api/v1/auth/login", data=credentials).status_code == 200
+
+    test_user.is_active = False
+    db_session.commit()
+
+    response = client.post("/api/v1/auth/login", data=credentials)
+    assert response.status_code == 403
+
+
+def test_login_after_password_change(client: TestClient, auth_headers):
+    """Test that the old password stops working as soon as it is changed."""
+    response = client.put(
+        "/api/v1/auth/me",
+        headers=auth_headers,
+        json={"password": "newpassword123"},
+    )
+    assert response.status_code == 200
+
+    old_login = client.post(
+        "/api/v1/auth/login",
+        data={"username": "test@example.com", "password": "testpassword"},
+    )
+    assert old_login.status_code == 401
+
+    new_login = client.post(
+        "/api/v1/auth/login",
+        data={"username": "test@example.com", "password": "newpassword123"},
+    )
+    assert new_login.status_code == 200
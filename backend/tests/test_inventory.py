@@ -1,11 +1,16 @@
+import json
+import orjson
 import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 
 from app.models.user import User, UserRole
 from app.models.property import Property
 from app.models.inventory import InventoryItem, InventoryCount, InventoryCountItem
 from app.models.supplier import Supplier
+from app.core.config import settings
 from app.core.security import get_password_hash
+from app.api.endpoints.inventory import prepare_vision_image, render_pdf_page_for_vision, get_count_sheet_prompt
 
 # Fixtures (test_property, second_property, test_supplier, test_inventory_item,
 # camp_worker_user, supervisor_user, purchasing_team_user, admin_user, admin_headers)
@@ -13,6 +18,14 @@ from app.core.security import get_password_hash
 from tests.conftest import get_auth_headers
 
 
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    """Each test starts from a fresh database, so drop catalogs and vision results cached by earlier tests."""
+    from app.api.endpoints import inventory
+    inventory._catalog_cache.clear()
+    inventory._vision_cache.clear()
+
+
 # ============== INVENTORY ITEMS CRUD ==============
 
 def test_create_inventory_item_as_camp_worker(client: TestClient, db_session, camp_worker_user, test_property, test_supplier):
@@ -126,6 +139,37 @@ def test_list_inventory_items_low_stock_only(client: TestClient, db_session, cam
     assert "Salt" not in returned_names
 
 
+def test_list_inventory_items_low_stock_uses_order_at_and_paginates(client: TestClient, db_session, camp_worker_user, test_property):
+    """Test that low_stock_only honours order_at over par_level and is applied before limit."""
+    headers = get_auth_headers(client, camp_worker_user.email)
+
+    db_session.add_all([
+        # Below par but above order_at -> not low
+        InventoryItem(name="Apples", unit="lb", property_id=test_property.id, par_level=50.0, order_at=10.0, current_stock=20.0),
+        # No threshold at all -> never low
+        InventoryItem(name="Bananas", unit="lb", property_id=test_property.id, current_stock=0.0),
+        # At order_at -> low
+        InventoryItem(name="Carrots", unit="lb", property_id=test_property.id, par_level=50.0, order_at=10.0, current_stock=10.0),
+        # Missing stock counts as 0 -> low
+        InventoryItem(name="Dates", unit="lb", property_id=test_property.id, par_level=5.0, current_stock=None),
+    ])
+    db_session.commit()
+
+    response = client.get(
+        f"/api/v1/inventory/items?property_id={test_property.id}&low_stock_only=true&limit=1",
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()] == ["Carrots"]
+
+    response = client.get(
+        f"/api/v1/inventory/items?property_id={test_property.id}&low_stock_only=true",
+        headers=headers,
+    )
+    assert [item["name"] for item in response.json()] == ["Carrots", "Dates"]
+
+
 def test_get_inventory_item_by_id(client: TestClient, db_session, camp_worker_user, test_inventory_item):
     """Test getting a single inventory item with computed fields."""
     headers = get_auth_headers(client, camp_worker_user.email)
@@ -217,6 +261,29 @@ def test_delete_inventory_item_soft_deletes(client: TestClient, db_session, camp
     assert test_inventory_item.id not in returned_ids
 
 
+def test_delete_inventory_item_other_property_forbidden(client: TestClient, db_session, camp_worker_user, second_property):
+    """Test that camp workers cannot delete items from another property."""
+    other_item = InventoryItem(property_id=second_property.id, name="Other Flour", unit="lb")
+    db_session.add(other_item)
+    db_session.commit()
+    headers = get_auth_headers(client, camp_worker_user.email)
+
+    response = client.delete(f"/api/v1/inventory/items/{other_item.id}", headers=headers)
+
+    assert response.status_code == 403
+    db_session.refresh(other_item)
+    assert other_item.is_active is True
+
+
+def test_delete_inventory_item_not_found(client: TestClient, db_session, camp_worker_user):
+    """Test deleting an item that doesn't exist returns 404."""
+    headers = get_auth_headers(client, camp_worker_user.email)
+
+    response = client.delete("/api/v1/inventory/items/99999", headers=headers)
+
+    assert response.status_code == 404
+
+
 # ============== CATEGORIES ==============
 
 def test_list_categories_for_property(client: TestClient, db_session, camp_worker_user, test_property, test_supplier):
@@ -229,6 +296,7 @@ def test_list_categories_for_property(client: TestClient, db_session, camp_worke
         InventoryItem(name="Cheese", category="Dairy", unit="lb", property_id=test_property.id, supplier_id=test_supplier.id, par_level=5.0, current_stock=3.0),
         InventoryItem(name="Chicken", category="Protein", unit="lb", property_id=test_property.id, supplier_id=test_supplier.id, par_level=20.0, current_stock=10.0),
         InventoryItem(name="Flour", category="Dry Goods", unit="lb", property_id=test_property.id, supplier_id=test_supplier.id, par_level=50.0, current_stock=25.0),
+        InventoryItem(name="Twine", category="", unit="roll", property_id=test_property.id, supplier_id=test_supplier.id, par_level=2.0, current_stock=1.0),
     ]
     db_session.add_all(items)
     db_session.commit()
@@ -246,6 +314,8 @@ def test_list_categories_for_property(client: TestClient, db_session, camp_worke
     assert "Dry Goods" in categories
     # Dairy should appear only once despite two Dairy items
     assert categories.count("Dairy") == 1
+    # Blank categories are left out
+    assert "" not in categories
 
 
 # ============== INVENTORY COUNTS ==============
@@ -361,6 +431,111 @@ def test_list_inventory_counts(client: TestClient, db_session, camp_worker_user,
     assert data[0]["is_finalized"] is True
 
 
+def test_finalize_count_updates_stock(client: TestClient, db_session, camp_worker_user, test_property, test_inventory_item):
+    """Test that finalizing a draft count sets each counted item's stock."""
+    count = InventoryCount(property_id=test_property.id, is_finalized=False)
+    count.items.append(InventoryCountItem(inventory_item_id=test_inventory_item.id, quantity=12.5))
+    db_session.add(count)
+    db_session.commit()
+    headers = get_auth_headers(client, camp_worker_user.email)
+
+    response = client.post(f"/api/v1/inventory/counts/{count.id}/finalize", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["is_finalized"] is True
+    db_session.refresh(test_inventory_item)
+    assert test_inventory_item.current_stock == 12.5
+
+
+def test_list_inventory_counts_cursor_pagination(client: TestClient, db_session, camp_worker_user, test_property):
+    """Test paging through counts newest-first with the X-Next-Cursor header."""
+    from datetime import datetime
+
+    # Two counts share a date so the id tiebreaker is exercised
+    dates = [datetime(2025, 6, day) for day in (1, 2, 2, 3, 4)]
+    counts = [InventoryCount(property_id=test_property.id, count_date=d) for d in dates]
+    db_session.add_all(counts)
+    db_session.commit()
+    expected_ids = [c.id for c in sorted(counts, key=lambda c: (c.count_date, c.id), reverse=True)]
+
+    headers = get_auth_headers(client, camp_worker_user.email)
+    seen_ids = []
+    params = {"property_id": test_property.id, "limit": 2}
+    while True:
+        response = client.get("/api/v1/inventory/counts", headers=headers, params=params)
+        assert response.status_code == 200
+        seen_ids.extend(count["id"] for count in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        params["cursor"] = next_cursor
+
+    assert seen_ids == expected_ids
+
+
+def test_list_inventory_items_cursor_pagination(client: TestClient, db_session, camp_worker_user, test_property):
+    """Test paging through items in list order with the X-Next-Cursor header."""
+    items = [
+        InventoryItem(property_id=test_property.id, name=name, category=category, unit="each", sort_order=0)
+        for name, category in [("Milk", "Dairy"), ("Apples", "Produce"), ("Butter", "Dairy"), ("Foil", None), ("Eggs", "Dairy")]
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+
+    headers = get_auth_headers(client, camp_worker_user.email)
+    all_names = [i["name"] for i in client.get(
+        "/api/v1/inventory/items", headers=headers, params={"property_id": test_property.id}
+    ).json()]
+
+    paged_names = []
+    params = {"property_id": test_property.id, "limit": 2}
+    while True:
+        response = client.get("/api/v1/inventory/items", headers=headers, params=params)
+        assert response.status_code == 200
+        paged_names.extend(item["name"] for item in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        params["cursor"] = next_cursor
+
+    assert paged_names == all_names
+    assert all_names == ["Foil", "Butter", "Eggs", "Milk", "Apples"]
+
+
+def test_list_inventory_counts_invalid_cursor(client: TestClient, db_session, camp_worker_user, test_property):
+    """Test that a malformed cursor is rejected."""
+    headers = get_auth_headers(client, camp_worker_user.email)
+
+    response = client.get(
+        "/api/v1/inventory/counts",
+        headers=headers,
+        params={"property_id": test_property.id, "cursor": "not-a-cursor"},
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path, values", [
+    ("/api/v1/inventory/items", ["x", "y", "z", "w"]),
+    ("/api/v1/inventory/items", [0, "Dairy", "Milk", True]),
+    ("/api/v1/inventory/counts", ["2024-01-01T00:00:00", "abc"]),
+    ("/api/v1/inventory/counts", ["not-a-date", 1]),
+])
+def test_list_rejects_cursor_with_wrong_value_types(client: TestClient, db_session, camp_worker_user, test_property, path, values):
+    """Test that a well-formed cursor holding values of the wrong type is rejected."""
+    from app.core.pagination import encode_cursor
+    headers = get_auth_headers(client, camp_worker_user.email)
+
+    response = client.get(
+        path,
+        headers=headers,
+        params={"property_id": test_property.id, "cursor": encode_cursor(values)},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
 def test_get_count_with_items_detail(client: TestClient, db_session, camp_worker_user, test_property, test_inventory_item):
     """Test getting a single inventory count with item details."""
     headers = get_auth_headers(client, camp_worker_user.email)
@@ -397,6 +572,598 @@ def test_get_count_with_items_detail(client: TestClient, db_session, camp_worker
     assert data["items"][0]["item_unit"] == "lb"
 
 
+# ============== AI VISION IMAGE PREPARATION ==============
+
+@pytest.mark.parametrize("size,expected_size", [
+    ((4000, 3000), (1024, 768)),    # Photo: short side reduced to 768px
+    ((800, 3000), (546, 2048)),     # Long receipt: long side reduced to 2048px
+    ((1000, 600), (1000, 600)),     # Already within both limits: not resized
+])
+def test_prepare_vision_image_downscales_to_jpeg(size, expected_size):
+    """Test that photos are resized to what Vision would scale them to and re-encoded as JPEG."""
+    import io
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, (255, 255, 255, 255)).save(buffer, format="PNG")
+
+    jpeg_bytes = prepare_vision_image(buffer.getvalue())
+
+    resized = Image.open(io.BytesIO(jpeg_bytes))
+    assert resized.format == "JPEG"
+    assert resized.size == expected_size
+
+
+def test_render_pdf_page_for_vision_returns_jpeg():
+    """Test that PDF pages are rendered as JPEGs within the size limit."""
+    import io
+    import fitz
+    from PIL import Image
+
+    doc = fitz.open()
+    doc.new_page(width=1600, height=1200)
+    pdf_content = doc.tobytes()
+    doc.close()
+
+    rendered = Image.open(io.BytesIO(render_pdf_page_for_vision(pdf_content, 0)))
+    assert rendered.format == "JPEG"
+    assert rendered.size == (1024, 768)
+
+
+@pytest.mark.parametrize("width,height,expected_scale", [
+    (612, 792, 2.0),      # Letter: upscaled, capped at 2x
+    (1000, 800, 1.6),     # Scaled to the 1600px target
+    (2400, 1800, 1.0),    # Already large: rendered at 1x
+])
+def test_pdf_render_scale_adapts_to_page_size(width, height, expected_scale):
+    """Test that the render scale adapts to the page size instead of a fixed 2x."""
+    import fitz
+    from app.utils.pdf import pdf_render_scale
+
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    assert pdf_render_scale(page) == pytest.approx(expected_scale)
+    doc.close()
+
+
+def test_analyze_photos_renders_every_pdf_page(client: TestClient, db_session, camp_worker_user, test_property, test_inventory_item):
+    """Test that each page of an uploaded PDF is rendered and sent to Vision."""
+    import fitz
+
+    doc = fitz.open()
+    for page in range(3):
+        doc.new_page().insert_text((72, 72), f"Count sheet page {page + 1}", fontsize=24)
+    pdf_content = doc.tobytes()
+    doc.close()
+
+    ai_counts = [{"item_id": test_inventory_item.id, "item_name": "Flour", "quantity": 4, "confidence": 0.9}]
+
+    headers = get_auth_headers(client, camp_worker_user.email)
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.stream_chat_completion", new=AsyncMock(return_value=json.dumps({"counts": ai_counts}))) as mock_stream:
+        response = client.post(
+            f"/api/v1/inventory/analyze-photos?property_id={test_property.id}",
+            headers=headers,
+            files=[("images", ("counts.pdf", pdf_content, "application/pdf"))],
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pages_processed"] == 3
+    assert data["extracted_counts"][0]["quantity"] == 4
+
+    prompts = "\n".join(
+        call.args[0]["messages"][1]["content"][0]["text"]
+        for call in mock_stream.call_args_list
+    )
+    for page in range(1, 4):
+        assert f"counts.pdf page {page}, page {page} of 3" in prompts
+    assert all(call.args[0]["response_format"]["type"] == "json_schema" for call in mock_stream.call_args_list)
+
+
+def test_analyze_photos_keeps_highest_confidence_count(client: TestClient, db_session, camp_worker_user, test_property, test_inventory_item):
+    """Test that an item counted on several pages keeps its highest-confidence count."""
+    import io
+    from PIL import Image
+
+    def photo(shade):
+        buffer = io.BytesIO()
+        Image.new("RGB", (100, 100), (shade, shade, shade)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def ai_response(quantity, confidence):
+        return json.dumps({"counts": [{"item_id": test_inventory_item.id, "quantity": quantity, "confidence": confidence}]})
+
+    headers = get_auth_headers(client, camp_worker_user.email)
+    responses = [ai_response(3, 0.6), ai_response(5, 0.95), ai_response(7, 0.95)]
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.stream_chat_completion", new=AsyncMock(side_effect=responses)):
+        response = client.post(
+            f"/api/v1/inventory/analyze-photos?property_id={test_property.id}",
+            headers=headers,
+            files=[("images", (f"page{n}.png", photo(255 - 40 * n), "image/png")) for n in range(3)],
+        )
+
+    assert response.status_code == 200
+    counts = response.json()["extracted_counts"]
+    assert len(counts) == 1
+    assert counts[0]["quantity"] == 5
+
+
+def test_analyze_photos_reuses_result_for_repeated_upload(client: TestClient, db_session, camp_worker_user, test_property, test_inventory_item):
+    """Test that re-uploading the same sheet reuses the earlier result until the item list changes."""
+    import io
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (100, 100), (200, 200, 200)).save(buffer, format="PNG")
+    photo = buffer.getvalue()
+
+    ai_counts = json.dumps({"counts": [{"item_id": test_inventory_item.id, "quantity": 4, "confidence": 0.9}]})
+    headers = get_auth_headers(client, camp_worker_user.email)
+
+    def analyze():
+        response = client.post(
+            f"/api/v1/inventory/analyze-photos?property_id={test_property.id}",
+            headers=headers,
+            files=[("images", ("sheet.png", photo, "image/png"))],
+        )
+        assert response.status_code == 200
+        assert response.json()["extracted_counts"][0]["quantity"] == 4
+
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.stream_chat_completion", new=AsyncMock(return_value=ai_counts)) as mock_stream:
+        analyze()
+        analyze()
+        assert mock_stream.call_count == 1
+
+        # A new item changes the prompt's item list, so the sheet is analyzed again
+        db_session.add(InventoryItem(property_id=test_property.id, name="Sugar", unit="lb"))
+        db_session.commit()
+        analyze()
+        assert mock_stream.call_count == 2
+
+
+def _streamed_ai_responses(*contents):
+    """Stand-in for iter_chat_completion: each call streams the next response a few characters at a time."""
+    async def stream(content):
+        for start in range(0, len(content), 7):
+            yield content[start:start + 7]
+
+    return MagicMock(side_effect=[stream(content) for content in contents])
+
+
+def test_seed_from_photo_sends_one_request_per_page(client: TestClient, db_session, admin_headers, test_property, test_inventory_item):
+    """Test that each photo is extracted separately and results are merged without duplicates."""
+    import io
+    from PIL import Image
+
+    def photo(shade):
+        buffer = io.BytesIO()
+        Image.new("RGB", (100, 100), (shade, shade, shade)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    responses = [
+        json.dumps({"items": [{"name": "Whole Milk", "unit": "Gallon", "category": "Dairy"}, {"name": "Flour", "unit": "Lb"}]}),
+        json.dumps({"items": [{"name": "whole milk", "unit": "Gallon", "category": "Dairy"}, {"name": "Rice", "unit": "Bag", "category": "Dry Goods"}]}),
+    ]
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.iter_chat_completion", new=_streamed_ai_responses(*responses)) as mock_stream:
+        response = client.post(
+            f"/api/v1/inventory/seed-from-photo?property_id={test_property.id}",
+            headers=admin_headers,
+            files=[("images", (f"sheet{n}.png", photo(255 - 40 * n), "image/png")) for n in range(2)],
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert mock_stream.call_count == 2
+    assert data["pages_processed"] == 2
+    assert [item["name"] for item in data["extracted_items"]] == ["Whole Milk", "Rice"]
+    assert data["skipped_duplicates"] == ["Flour", "whole milk"]
+
+
+@pytest.mark.parametrize("name,expected", [
+    ("Whole Milk", True),
+    ("  WHOLE MILK ", True),
+    ("Milk", True),
+    ("Organic Whole Milk 2%", True),
+    ("Rice Flour", True),
+    ("Almond Flour Blend", True),
+    ("Rice", False),
+    ("Flou", True),
+    ("Oat Milk", False),
+    ("", False),
+])
+def test_name_match_index(name, expected):
+    """Test exact, contained-in and containing name matches against the index."""
+    from app.utils.names import NameMatchIndex
+
+    index = NameMatchIndex(["Whole Milk", "flour", "Ketchup"])
+    assert index.matches(name) is expected
+
+
+@pytest.mark.parametrize("content", [
+    '[{"name": "Rice", "par_level": 12}, {"name": "Flour [bulk]", "par_level": null}]',
+    '{"items": [\n  {"name": "Rice", "par_level": 12},\n  {"name": "Flour [bulk]", "par_level": null}\n]}',
+])
+async def test_iter_ai_json_array_yields_items_as_they_stream(content):
+    """Test that array elements are parsed from arbitrarily split chunks, inside a wrapping object or not."""
+    from app.api.endpoints.inventory import iter_ai_json_array
+
+    async def deltas():
+        for char in content:
+            yield char
+
+    items = [item async for item in iter_ai_json_array(deltas())]
+    assert items == [{"name": "Rice", "par_level": 12}, {"name": "Flour [bulk]", "par_level": None}]
+
+
+async def test_iter_ai_json_array_raises_on_truncated_response():
+    """Test that a response cut off before the array closes is reported as a JSON error."""
+    from app.api.endpoints.inventory import iter_ai_json_array
+
+    async def deltas():
+        yield '[{"name": "Rice"}, {"name": "Fl'
+
+    with pytest.raises(json.JSONDecodeError):
+        [item async for item in iter_ai_json_array(deltas())]
+
+
+def test_seed_confirm_skips_existing_and_repeated_names(client: TestClient, db_session, admin_headers, test_property, test_inventory_item):
+    """Test that confirmed seed items matching an existing or earlier name are skipped."""
+    response = client.post(
+        f"/api/v1/inventory/seed-confirm?property_id={test_property.id}",
+        headers=admin_headers,
+        json=[
+            {"name": "  FLOUR ", "unit": "Lb", "category": "Dry Goods"},
+            {"name": "Rice", "unit": "Bag", "category": "Dry Goods"},
+            {"name": "rice", "unit": "Bag", "category": "Dry Goods"},
+            {"name": "Salsa", "unit": "Jar", "category": "Not A Category"},
+        ],
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created_items"] == ["Rice", "Salsa"]
+    assert data["skipped_items"] == ["FLOUR", "rice"]
+
+    salsa = db_session.query(InventoryItem).filter(InventoryItem.name == "Salsa").one()
+    assert salsa.category == "Other"
+    assert salsa.property_id == test_property.id
+    assert salsa.is_recurring is True
+    assert salsa.sort_order == 0
+
+
+def test_seed_from_photo_uses_cached_catalog_for_duplicates(client: TestClient, db_session, admin_headers, test_property, test_inventory_item):
+    """Test that items added after the catalog was cached are still treated as existing."""
+    import io
+    from PIL import Image
+    from app.api.endpoints.inventory import get_property_catalog
+
+    get_property_catalog(test_property.id, db_session)
+    db_session.add(InventoryItem(property_id=test_property.id, name="Rice", unit="Bag"))
+    db_session.commit()
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (100, 100), (255, 255, 255)).save(buffer, format="PNG")
+
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.iter_chat_completion", new=_streamed_ai_responses(json.dumps({"items": [{"name": "Rice"}]}))):
+        response = client.post(
+            f"/api/v1/inventory/seed-from-photo?property_id={test_property.id}",
+            headers=admin_headers,
+            files=[("images", ("sheet.png", buffer.getvalue(), "image/png"))],
+        )
+
+    assert response.status_code == 200
+    assert response.json()["skipped_duplicates"] == ["Rice"]
+
+
+def _openai_stream_client(chunks, status_code=200):
+    """An httpx client whose requests are answered with the given chat-completion SSE chunks."""
+    import httpx
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if status_code != 200:
+            return httpx.Response(status_code, json={"error": {"message": "Rate limit reached"}})
+        events = [
+            b"data: " + orjson.dumps({"choices": [{"delta": {"content": chunk}}]}) + b"\n\n"
+            for chunk in chunks
+        ]
+        return httpx.Response(200, content=b"".join(events) + b"data: [DONE]\n\n")
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requests
+
+
+async def test_stream_chat_completion_accumulates_deltas():
+    """Test that streamed delta content is joined into the full message."""
+    from app.core.http_client import stream_chat_completion
+
+    client, requests = _openai_stream_client(['[{"name": ', '"Rice"}', ']'])
+    with patch("app.core.http_client.get_openai_http_client", return_value=client):
+        content = await stream_chat_completion({"model": "gpt-4o", "messages": []}, timeout=10.0)
+
+    assert content == '[{"name": "Rice"}]'
+    assert orjson.loads(requests[0].content)["stream"] is True
+
+
+async def test_stream_chat_completion_raises_on_error_status():
+    """Test that a non-200 response raises OpenAIAPIError with the error body."""
+    from app.core.http_client import stream_chat_completion, OpenAIAPIError
+
+    client, _ = _openai_stream_client([], status_code=429)
+    with patch("app.core.http_client.get_openai_http_client", return_value=client):
+        with pytest.raises(OpenAIAPIError) as exc_info:
+            await stream_chat_completion({"model": "gpt-4o", "messages": []}, timeout=10.0)
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.detail == {"error": {"message": "Rate limit reached"}}
+
+
+async def test_token_bucket_waits_once_burst_is_spent():
+    """Test that acquisitions beyond the bucket's capacity wait for it to refill."""
+    import time
+    from app.core.http_client import TokenBucket
+
+    bucket = TokenBucket(capacity=2, rate=20)
+    started = time.monotonic()
+    for _ in range(2):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.04
+
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.045
+
+
+def test_count_sheet_prompt_rebuilt_when_items_change(client: TestClient, db_session, test_property, test_supplier):
+    """Test that the cached count-sheet prompt picks up added and deactivated items."""
+    assert get_count_sheet_prompt(test_property.id, db_session) is None
+
+    flour = InventoryItem(property_id=test_property.id, supplier_id=test_supplier.id, name="Flour", unit="lb")
+    db_session.add(flour)
+    db_session.commit()
+
+    prompt = get_count_sheet_prompt(test_property.id, db_session)
+    assert f"- Flour (ID: {flour.id}, Unit: lb)" in prompt
+    assert get_count_sheet_prompt(test_property.id, db_session) is prompt
+
+    sugar = InventoryItem(property_id=test_property.id, supplier_id=test_supplier.id, name="Sugar", unit="lb")
+    db_session.add(sugar)
+    flour.is_active = False
+    db_session.commit()
+
+    prompt = get_count_sheet_prompt(test_property.id, db_session)
+    assert "Sugar" in prompt
+    assert "Flour" not in prompt
+
+
+# ============== CSV EXPORT ==============
+
+def test_sort_category_sorts_each_unsorted_group(client: TestClient, db_session, admin_headers, test_property):
+    """Test that every category with new items is sorted and gets its own sort order."""
+    for name, category in [("Yogurt", "Dairy"), ("Butter", "Dairy"), ("Onion", "Produce"), ("Apple", "Produce")]:
+        db_session.add(InventoryItem(property_id=test_property.id, name=name, category=category, unit="Each"))
+    db_session.commit()
+
+    with patch.object(settings, "OPENAI_API_KEY", ""):
+        response = client.post(f"/api/v1/inventory/sort-category?property_id={test_property.id}", headers=admin_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(c["category"] for c in data["sorted_categories"]) == ["Dairy", "Produce"]
+    assert data["total_items_sorted"] == 4
+
+    db_session.expire_all()
+    orders = {item.name: item.sort_order for item in db_session.query(InventoryItem).all()}
+    assert orders == {"Butter": 1, "Yogurt": 2, "Apple": 1, "Onion": 2}
+
+
+def test_sort_category_batches_categories_into_one_request(client: TestClient, db_session, admin_headers, test_property):
+    """Test that all categories are sorted in one AI request, with a bad ordering falling back to alphabetical."""
+    items = {}
+    for name, category, subcategory in [
+        ("Apple", "Produce", "Fruit"), ("Banana", "Produce", "Fruit"), ("Cherry", "Produce", "Fruit"),
+        ("Butter", "Dairy", None), ("Milk", "Dairy", None), ("Yogurt", "Dairy", None),
+        ("Salt", "Spices", None),
+    ]:
+        item = InventoryItem(property_id=test_property.id, name=name, category=category, subcategory=subcategory, unit="Each")
+        db_session.add(item)
+        items[name] = item
+    db_session.commit()
+
+    ai_order = {
+        "Produce > Fruit": [items["Cherry"].id, items["Banana"].id, items["Apple"].id],
+        "Dairy": [items["Milk"].id, items["Yogurt"].id],
+    }
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.iter_chat_completion", new=_streamed_ai_responses(json.dumps(ai_order))) as mock_stream:
+        response = client.post(f"/api/v1/inventory/sort-category?property_id={test_property.id}", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert mock_stream.call_count == 1
+    sent = json.loads(mock_stream.call_args.args[0]["messages"][1]["content"].split("\n\n", 1)[1])
+    # A single-item category isn't worth an AI sort
+    assert set(sent) == {"Produce > Fruit", "Dairy"}
+
+    db_session.expire_all()
+    orders = {item.name: item.sort_order for item in db_session.query(InventoryItem).all()}
+    # Dairy came back incomplete, so it is sorted alphabetically
+    assert orders == {"Cherry": 1, "Banana": 2, "Apple": 3, "Butter": 1, "Milk": 2, "Yogurt": 3, "Salt": 1}
+
+
+def test_sort_category_reads_labels_containing_braces(client: TestClient, db_session, admin_headers, test_property):
+    """Test that a "}" inside a category label doesn't cut the streamed AI reply short."""
+    items = {}
+    for name, category in [("Rope", "Misc {bulk}"), ("Bags", "Misc {bulk}"), ("Tape", "Misc {bulk}"),
+                           ("Butter", "Dairy"), ("Milk", "Dairy"), ("Yogurt", "Dairy")]:
+        item = InventoryItem(property_id=test_property.id, name=name, category=category, unit="Each")
+        db_session.add(item)
+        items[name] = item
+    db_session.commit()
+
+    ai_order = {
+        "Misc {bulk}": [items["Tape"].id, items["Rope"].id, items["Bags"].id],
+        "Dairy": [items["Milk"].id, items["Yogurt"].id, items["Butter"].id],
+    }
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.iter_chat_completion", new=_streamed_ai_responses(json.dumps(ai_order))):
+        response = client.post(f"/api/v1/inventory/sort-category?property_id={test_property.id}", headers=admin_headers)
+
+    assert response.status_code == 200
+    db_session.expire_all()
+    orders = {item.name: item.sort_order for item in db_session.query(InventoryItem).all()}
+    assert orders == {"Tape": 1, "Rope": 2, "Bags": 3, "Milk": 1, "Yogurt": 2, "Butter": 3}
+
+
+def test_sort_category_reuses_cached_order_for_same_items(client: TestClient, db_session, admin_headers, test_property, second_property):
+    """Test that a category with the same item names at another property is sorted from the cache."""
+    def add_items(prop):
+        items = {name: InventoryItem(property_id=prop.id, name=name, category="Dairy", unit="Each") for name in ["Butter", "Milk", "Yogurt"]}
+        db_session.add_all(items.values())
+        db_session.commit()
+        return items
+
+    first = add_items(test_property)
+    ai_order = {"Dairy": [first["Milk"].id, first["Yogurt"].id, first["Butter"].id]}
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.iter_chat_completion", new=_streamed_ai_responses(json.dumps(ai_order))) as mock_stream:
+        response = client.post(f"/api/v1/inventory/sort-category?property_id={test_property.id}", headers=admin_headers)
+        assert response.status_code == 200
+
+        second = add_items(second_property)
+        response = client.post(f"/api/v1/inventory/sort-category?property_id={second_property.id}", headers=admin_headers)
+        assert response.status_code == 200
+
+    assert mock_stream.call_count == 1
+    db_session.expire_all()
+    assert [second[name].sort_order for name in ["Milk", "Yogurt", "Butter"]] == [1, 2, 3]
+
+
+def test_sort_category_force_replaces_cached_order(client: TestClient, db_session, admin_headers, test_property):
+    """Test that a forced sort asks the AI again and replaces the cached order."""
+    from app.models.inventory import AISortCache
+
+    items = {name: InventoryItem(property_id=test_property.id, name=name, category="Dairy", unit="Each") for name in ["Butter", "Milk", "Yogurt"]}
+    db_session.add_all(items.values())
+    db_session.commit()
+
+    first_order = {"Dairy": [items["Milk"].id, items["Yogurt"].id, items["Butter"].id]}
+    second_order = {"Dairy": [items["Butter"].id, items["Milk"].id, items["Yogurt"].id]}
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"), \
+         patch("app.api.endpoints.inventory.iter_chat_completion",
+               new=_streamed_ai_responses(json.dumps(first_order), json.dumps(second_order))) as mock_stream:
+        response = client.post(f"/api/v1/inventory/sort-category?property_id={test_property.id}", headers=admin_headers)
+        assert response.status_code == 200
+        response = client.post(f"/api/v1/inventory/sort-category?property_id={test_property.id}&force=true", headers=admin_headers)
+        assert response.status_code == 200
+
+    assert mock_stream.call_count == 2
+    db_session.expire_all()
+    assert [items[name].sort_order for name in ["Butter", "Milk", "Yogurt"]] == [1, 2, 3]
+    assert [row.ordered_names for row in db_session.query(AISortCache).all()] == [["butter", "milk", "yogurt"]]
+
+
+def test_printable_list_returns_newly_sorted_order(client: TestClient, db_session, admin_headers, test_property):
+    """Test that the printable list reflects the sort it just applied, grouped by category."""
+    for name, category in [("Yogurt", "Dairy"), ("Onion", "Produce"), ("Butter", "Dairy"), ("Apple", "Produce")]:
+        db_session.add(InventoryItem(property_id=test_property.id, name=name, category=category, unit="Each"))
+    db_session.commit()
+
+    with patch.object(settings, "OPENAI_API_KEY", ""):
+        response = client.get(f"/api/v1/inventory/printable-list?property_id={test_property.id}", headers=admin_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["categories_sorted"]) == 2
+    assert [(item["name"], item["sort_order"]) for item in data["items"]] == [
+        ("Butter", 1), ("Yogurt", 2), ("Apple", 1), ("Onion", 2)
+    ]
+
+
+def test_printable_sheet_lists_recurring_items(client: TestClient, db_session, admin_headers, test_property):
+    """Test that the printable sheet lists only active recurring items, in category order."""
+    for name, category, is_recurring, is_active in [
+        ("Yogurt", "Dairy", True, True),
+        ("Apple", "Produce", True, True),
+        ("One-off", "Dairy", False, True),
+        ("Retired", "Dairy", True, False),
+    ]:
+        db_session.add(InventoryItem(
+            property_id=test_property.id, name=name, category=category, unit="Each",
+            par_level=4, is_recurring=is_recurring, is_active=is_active
+        ))
+    db_session.commit()
+
+    response = client.get(f"/api/v1/inventory/printable/{test_property.id}", headers=admin_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["property_code"] == test_property.code
+    assert [(item["name"], item["par_level"], item["current_stock"]) for item in data["items"]] == [
+        ("Yogurt", 4, 0), ("Apple", 4, 0)
+    ]
+
+
+def test_printable_list_for_property_without_items(client: TestClient, db_session, admin_headers, test_property):
+    """Test that a property with no recurring items returns an empty list, and a missing one a 404."""
+    db_session.add(InventoryItem(property_id=test_property.id, name="One-off", category="Dairy", unit="Each", is_recurring=False))
+    db_session.commit()
+
+    response = client.get(f"/api/v1/inventory/printable-list?property_id={test_property.id}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["property_name"] == test_property.name
+    assert response.json()["items"] == []
+
+    response = client.get("/api/v1/inventory/printable-list?property_id=99999", headers=admin_headers)
+    assert response.status_code == 404
+
+
+def test_sorting_status_counts_unsorted_items_per_category(client: TestClient, db_session, admin_headers, test_property):
+    """Test that sorting status reports totals and unsorted counts per category and subcategory."""
+    from datetime import datetime
+
+    for name, category, subcategory, last_sorted_at in [
+        ("Apple", "Produce", "Fruit", datetime(2026, 1, 1)),
+        ("Banana", "Produce", "Fruit", None),
+        ("Onion", "Produce", None, datetime(2026, 1, 1)),
+        ("Milk", "Dairy", None, datetime(2026, 1, 1)),
+        ("Mystery", None, None, None),
+    ]:
+        db_session.add(InventoryItem(
+            property_id=test_property.id, name=name, category=category,
+            subcategory=subcategory, unit="Each", last_sorted_at=last_sorted_at
+        ))
+    db_session.commit()
+
+    response = client.get(f"/api/v1/inventory/sorting-status?property_id={test_property.id}", headers=admin_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    categories = {c["category"]: c for c in data["categories"]}
+    assert data["total_unsorted"] == 2
+    assert categories["Produce"]["total_items"] == 3
+    assert categories["Produce"]["unsorted_items"] == 1
+    assert categories["Produce"]["subcategories"] == [
+        {"name": "Fruit", "total_items": 2, "unsorted_items": 1, "needs_sorting": True}
+    ]
+    assert categories["Dairy"]["needs_sorting"] is False
+    assert categories["Uncategorized"]["unsorted_items"] == 1
+
+
+def test_export_inventory_csv_includes_supplier_name(client: TestClient, db_session, admin_headers, test_property, test_inventory_item, test_supplier):
+    """Test that the CSV export lists items with their supplier name."""
+    response = client.get(f"/api/v1/inventory/export/{test_property.id}", headers=admin_headers)
+
+    assert response.status_code == 200
+    lines = response.text.strip().splitlines()
+    assert lines[0].startswith("id,name,")
+    assert test_supplier.name in lines[1]
+
+
 # ============== ACCESS CONTROL ==============
 
 def test_camp_worker_can_only_see_own_property_items(client: TestClient, db_session, camp_worker_user, test_property, second_property, test_supplier):
@@ -6,6 +6,7 @@ from app.models.inventory import InventoryItem
 from app.models.supplier import Supplier
 from app.models.property import Property
 from app.core.security import get_password_hash
+from app.api.endpoints import master_products
 
 from tests.conftest import get_auth_headers
 
@@ -131,6 +132,7 @@ def test_list_products_with_assigned_property_count(
     matched = [p for p in data if p["id"] == product.id]
     assert len(matched) == 1
     assert matched[0]["assigned_property_count"] == 1
+    assert matched[0]["supplier_name"] == test_supplier.name
 
 
 def test_list_products_with_search_filter(client: TestClient, db_session, admin_user, test_supplier):
@@ -342,6 +344,38 @@ def test_assign_already_assigned_property_is_skipped(
     assert data["skipped"][0]["reason"] == "Already assigned"
 
 
+def test_assign_mixed_properties_in_one_request(
+    client: TestClient, db_session, admin_user, test_supplier, test_property, second_property
+):
+    """22. One request can create, skip missing properties and skip a property listed twice."""
+    product = _create_master_product(db_session, supplier=test_supplier)
+    headers = get_auth_headers(client, admin_user.email)
+
+    response = client.post(
+        f"{API}/{product.id}/assign",
+        headers=headers,
+        json={"property_ids": [second_property.id, 99999, test_property.id, second_property.id]},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [(c["property_id"], c["property_name"]) for c in data["created"]] == [
+        (second_property.id, second_property.name),
+        (test_property.id, test_property.name),
+    ]
+    assert [(s["property_id"], s["reason"]) for s in data["skipped"]] == [
+        (99999, "Property not found"),
+        (second_property.id, "Already assigned"),
+    ]
+    assert data["skipped"][1]["inventory_item_id"] == data["created"][0]["inventory_item_id"]
+
+    items = db_session.query(InventoryItem).filter(InventoryItem.master_product_id == product.id).all()
+    assert {item.id: item.property_id for item in items} == {
+        c["inventory_item_id"]: c["property_id"] for c in data["created"]
+    }
+    assert all(item.name == product.name and item.is_recurring for item in items)
+
+
 def test_assign_with_par_level_override(
     client: TestClient, db_session, admin_user, test_supplier, test_property
 ):
@@ -540,6 +574,50 @@ def test_seed_from_property_creates_master_products(
     assert master1.default_par_level == 12.0
 
 
+def test_seed_from_property_links_existing_masters_without_duplicates(
+    client: TestClient, db_session, admin_user, test_supplier, test_property
+):
+    """25. seed-from-property links by case-insensitive name and never links one master twice per property."""
+    milk = _create_master_product(db_session, name="MILK", sku="MILK")
+    salt = _create_master_product(db_session, name="Salt", sku="SALT")
+
+    def item(name, master_product_id=None):
+        row = InventoryItem(
+            property_id=test_property.id, name=name, unit="each",
+            master_product_id=master_product_id, is_recurring=True, is_active=True
+        )
+        db_session.add(row)
+        return row
+
+    item("Table Salt", master_product_id=salt.id)  # already linked to Salt
+    milk_item = item("Milk")
+    salt_item = item("salt")
+    eggs = item("Eggs")
+    eggs_again = item("eggs")
+    db_session.commit()
+
+    headers = get_auth_headers(client, admin_user.email)
+    response = client.post(
+        f"{API}/seed-from-property",
+        headers=headers,
+        json={"property_id": test_property.id},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created_count"] == 1
+    assert data["linked_count"] == 1
+    assert [(i["item_id"], i["action"]) for i in data["items"]] == [
+        (eggs.id, "created"), (milk_item.id, "linked")
+    ]
+
+    db_session.expire_all()
+    assert milk_item.master_product_id == milk.id
+    assert salt_item.master_product_id is None
+    assert eggs.master_product_id == data["items"][0]["master_product_id"]
+    assert eggs_again.master_product_id is None
+
+
 # ============== OTHER TESTS ==============
 
 def test_list_categories(client: TestClient, db_session, admin_user, test_supplier):
@@ -601,3 +679,111 @@ def test_list_unlinked_items(
     names = [item["name"] for item in data]
     assert "Orphan Sugar" in names
     assert "Linked Flour" not in names
+
+
+def test_cleanup_non_recurring_master_products(
+    client: TestClient, db_session, admin_user, test_supplier, test_property
+):
+    """23. cleanup-non-recurring deletes masters with only non-recurring items and unlinks the rest."""
+    only_one_off = _create_master_product(db_session, supplier=test_supplier, name="Party Hats", sku="HATS")
+    mixed = _create_master_product(db_session, supplier=test_supplier, name="Milk", sku="MILK")
+    recurring_only = _create_master_product(db_session, supplier=test_supplier, name="Eggs", sku="EGGS")
+
+    def link(product, name, is_recurring):
+        item = InventoryItem(
+            property_id=test_property.id, master_product_id=product.id,
+            name=name, unit="each", is_recurring=is_recurring
+        )
+        db_session.add(item)
+        return item
+
+    hats = link(only_one_off, "Party Hats", False)
+    milk = link(mixed, "Milk", True)
+    milk_one_off = link(mixed, "Milk (event)", False)
+    eggs = link(recurring_only, "Eggs", True)
+    db_session.commit()
+    deleted_id = only_one_off.id
+
+    headers = get_auth_headers(client, admin_user.email)
+    response = client.delete(f"{API}/cleanup-non-recurring", headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deleted_master_products"] == 1
+    assert data["deleted_names"] == ["Party Hats"]
+    assert data["unlinked_items"] == 1
+
+    db_session.expire_all()
+    assert db_session.get(MasterProduct, deleted_id) is None
+    assert hats.master_product_id is None
+    assert milk.master_product_id == mixed.id
+    assert milk_one_off.master_product_id is None
+    assert eggs.master_product_id == recurring_only.id
+
+
+def test_upload_csv_creates_and_updates_products(client: TestClient, db_session, admin_user, test_supplier):
+    """24. upload-csv updates products matched by SKU or name and creates the rest."""
+    by_sku = _create_master_product(db_session, name="Old Flour Name", sku="FLOUR-1")
+    by_name = _create_master_product(db_session, name="Whole Milk", sku=None, unit="gallon")
+
+    csv_content = (
+        "name,sku,category,unit,unit_price,supplier_name\n"
+        "Bread Flour,FLOUR-1,Dry Goods,lb,1.25,\n"
+        "WHOLE MILK,,Dairy,,3.5,\n"
+        f"Sea Salt,SALT-1,Spices,oz,,{test_supplier.name}\n"
+        ",NO-NAME,Other,each,,\n"
+    )
+
+    headers = get_auth_headers(client, admin_user.email)
+    response = client.post(
+        f"{API}/upload-csv",
+        headers=headers,
+        files={"file": ("products.csv", csv_content, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created_count"] == 1
+    assert data["updated_count"] == 2
+    assert data["errors"] == ["Row 5: Name is required"]
+
+    db_session.expire_all()
+    assert (by_sku.name, by_sku.unit_price) == ("Bread Flour", 1.25)
+    assert (by_name.name, by_name.category, by_name.unit, by_name.unit_price) == ("WHOLE MILK", "Dairy", "gallon", 3.5)
+
+    salt = db_session.query(MasterProduct).filter(MasterProduct.sku == "SALT-1").one()
+    assert (salt.name, salt.category, salt.unit, salt.supplier_id) == ("Sea Salt", "Spices", "oz", test_supplier.id)
+
+
+def test_upload_csv_matches_rows_across_chunks(client: TestClient, db_session, admin_user, monkeypatch):
+    """26. upload-csv parses in chunks but still matches every row and numbers errors by CSV row."""
+    monkeypatch.setattr(master_products, "CSV_CHUNK_SIZE", 2)
+    flour = _create_master_product(db_session, name="Flour", sku="FLOUR-1")
+    milk = _create_master_product(db_session, name="Milk", sku="MILK-1")
+
+    csv_content = (
+        "name,sku,unit_price\n"
+        "Bread Flour,FLOUR-1,1.25\n"
+        "Sea Salt,SALT-1,\n"
+        ",NO-NAME,\n"
+        "milk,,3.5\n"
+        "Sugar,,\n"
+    )
+
+    headers = get_auth_headers(client, admin_user.email)
+    response = client.post(
+        f"{API}/upload-csv",
+        headers=headers,
+        files={"file": ("products.csv", csv_content, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created_count"], data["updated_count"]) == (2, 2)
+    assert data["errors"] == ["Row 4: Name is required"]
+
+    db_session.expire_all()
+    assert (flour.name, flour.unit_price) == ("Bread Flour", 1.25)
+    assert (milk.name, milk.unit_price) == ("milk", 3.5)
+    created = db_session.query(MasterProduct.name).filter(MasterProduct.name.in_(["Sea Salt", "Sugar"])).all()
+    assert sorted(name for (name,) in created) == ["Sea Salt", "Sugar"]